@@ -0,0 +1,120 @@
+"""
+Two-call (extract_areas + extract_systems) versus combined
+(extract_inspection) extraction: wall time and prompt/completion tokens.
+
+Runs against the fake OpenAI server by default; pass --live to use the API
+configured in the environment. The response cache is not used.
+
+    python benchmarks/bench_combined.py [--text data/inspection.txt] [--repeat 3] [--live]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+DEFAULT_TEXT = os.path.join(ROOT, "data", "inspection.txt")
+DEFAULT_OUT = os.path.join(ROOT, "benchmarks", "results", "combined.json")
+
+
+def call(module, text):
+    import llm_client
+
+    messages = [
+        {"role": "system", "content": "Return strict JSON only."},
+        {"role": "user", "content": module.build_prompt(text)},
+    ]
+    result = llm_client.chat(module.MODEL_NAME, messages, temperature=0)
+    module.parse_response(result["content"])
+    return result
+
+
+def summarise(name, runs):
+    return {
+        "mode": name,
+        "runs": len(runs),
+        "mean_wall_s": round(sum(r["wall_s"] for r in runs) / len(runs), 3),
+        "prompt_tokens": runs[-1]["prompt_tokens"],
+        "completion_tokens": runs[-1]["completion_tokens"],
+        "calls": runs[-1]["calls"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark combined vs two-call inspection extraction.")
+    parser.add_argument("--text", default=DEFAULT_TEXT)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=800.0,
+                        help="Fake server latency per call (ignored with --live).")
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    args = parser.parse_args()
+
+    server = None
+    if not args.live:
+        import fake_openai_server
+
+        server, url = fake_openai_server.start_server(0, args.latency_ms)
+        os.environ["OPENAI_BASE_URL"] = url
+        os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+    import compact
+    import extract_areas
+    import extract_systems
+    import extract_inspection
+
+    with open(args.text, "r", encoding="utf-8") as f:
+        text = compact.compact_inspection_text(f.read())
+
+    two_call, combined = [], []
+
+    for _ in range(args.repeat):
+        # The pipeline runs the two extractors side by side, so do the same.
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            results = list(pool.map(lambda m: call(m, text), [extract_areas, extract_systems]))
+        two_call.append({
+            "wall_s": time.perf_counter() - t0,
+            "prompt_tokens": sum(r["prompt_tokens"] or 0 for r in results),
+            "completion_tokens": sum(r["completion_tokens"] or 0 for r in results),
+            "calls": 2,
+        })
+
+        t0 = time.perf_counter()
+        result = call(extract_inspection, text)
+        combined.append({
+            "wall_s": time.perf_counter() - t0,
+            "prompt_tokens": result["prompt_tokens"] or 0,
+            "completion_tokens": result["completion_tokens"] or 0,
+            "calls": 1,
+        })
+
+    if server:
+        server.shutdown()
+
+    report = {
+        "text": args.text,
+        "live": args.live,
+        "results": [summarise("two_call", two_call), summarise("combined", combined)],
+    }
+
+    for r in report["results"]:
+        print(
+            f"{r['mode']:>9}: {r['calls']} call(s), mean {r['mean_wall_s']:.2f}s, "
+            f"{r['prompt_tokens']} prompt + {r['completion_tokens']} completion tokens"
+        )
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"[SUCCESS] Results saved → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Measure the startup import cost of every entry point with
+`python -X importtime`, in a fresh interpreter per run.
+
+    python benchmarks/bench_imports.py [--repeat 5] \
+        [--baseline benchmarks/results/imports.json] [--tolerance 0.25]
+
+Importing an entry point must not load the OCR stack (easyocr, torch):
+text-layer PDFs should never pay for it. An entry point that does, or one
+slower than the baseline by more than the tolerance, is reported and the
+exit status is 1.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+
+DEFAULT_OUT = os.path.join(ROOT, "benchmarks", "results", "imports.json")
+
+ENTRY_POINTS = [
+    "run_pipeline",
+    "run_batch",
+    "run_server",
+    "run_client",
+    "extract_text",
+    "extract_text_ocr",
+    "extract_areas",
+    "extract_systems",
+    "extract_thermal",
+    "extract_inspection",
+    "merge",
+    "rules",
+    "thermal_images",
+    "diagnostic_store",
+]
+
+# Only ever imported once a code path needs them.
+LAZY = ["torch", "easyocr", "openai", "httpx", "dotenv", "tiktoken", "pdfplumber"]
+FORBIDDEN = {"torch", "easyocr"}
+
+TOP_PACKAGES = 5
+
+
+def parse_importtime(stderr: str) -> list:
+    """(module, depth, cumulative us) per line of -X importtime output, in order."""
+    rows = []
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        # Nested imports are indented two spaces per level.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(cumulative)))
+
+    return rows
+
+
+def direct_imports(rows: list, module: str) -> dict:
+    """Cumulative us of the modules the entry point itself imported."""
+    # A module's own imports are printed just before it, one level deeper.
+    end = next(i for i, (name, depth, _) in enumerate(rows) if name == module and depth == 0)
+
+    children = {}
+    for name, depth, us in reversed(rows[:end]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children[name] = us
+
+    return children
+
+
+def measure(module: str) -> tuple:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, SCRIPTS]))
+
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "unknown error"
+        raise RuntimeError(f"[ERROR] import {module} failed: {error}")
+
+    return wall, parse_importtime(proc.stderr)
+
+
+def bench_entry(module: str, repeat: int) -> dict:
+    walls = []
+    imports = []
+
+    for _ in range(repeat):
+        try:
+            wall, rows = measure(module)
+        except RuntimeError as e:
+            return {"entry": module, "skipped": str(e)}
+
+        walls.append(wall)
+        imports.append(rows)
+
+    # Import times are noisy; keep the fastest run's breakdown.
+    rows = min(imports, key=lambda rows: next(us for name, _, us in rows if name == module))
+    cumulative = {name: us for name, _, us in rows}
+
+    children = direct_imports(rows, module)
+    top = sorted(children, key=lambda name: -children[name])[:TOP_PACKAGES]
+
+    row = {
+        "entry": module,
+        "import_ms": round(cumulative[module] / 1000, 1),
+        "process_ms": round(statistics.median(walls) * 1000, 1),
+        "modules": len(rows),
+        "heaviest": {name: round(children[name] / 1000, 1) for name in top},
+        "loaded_lazy": [name for name in LAZY if name in cumulative],
+    }
+
+    print(f"[INFO] {module}: {row['import_ms']} ms import, {row['process_ms']} ms process, "
+          f"{row['modules']} modules")
+    return row
+
+
+def compare(rows, baseline_path, tolerance):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {r["entry"]: r for r in json.load(f)["results"] if "import_ms" in r}
+
+    regressions = []
+    for r in rows:
+        base = baseline.get(r["entry"])
+        if not base or "import_ms" not in r or not base["import_ms"]:
+            continue
+
+        ratio = r["import_ms"] / base["import_ms"]
+        r["baseline_import_ms"] = base["import_ms"]
+        r["ratio"] = round(ratio, 3)
+
+        if ratio > 1 + tolerance:
+            regressions.append(r)
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the import time of every entry point.")
+    parser.add_argument("--entry", nargs="+", default=ENTRY_POINTS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    args = parser.parse_args()
+
+    rows = [bench_entry(module, args.repeat) for module in args.entry]
+
+    regressions = compare(rows, args.baseline, args.tolerance) if args.baseline else []
+    eager = [r for r in rows if FORBIDDEN & set(r.get("loaded_lazy", []))]
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": rows,
+    }
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"[SUCCESS] Results saved → {args.out}")
+
+    for r in rows:
+        if "skipped" in r:
+            print(f"[WARNING] {r['entry']} skipped: {r['skipped']}")
+
+    for r in eager:
+        print(f"[WARNING] {r['entry']} imports {sorted(FORBIDDEN & set(r['loaded_lazy']))} at startup")
+
+    for r in regressions:
+        print(f"[WARNING] {r['entry']}: {r['import_ms']} ms vs {r['baseline_import_ms']} ms "
+              f"baseline ({r['ratio']}x)")
+
+    if eager or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Throughput and failure behaviour of scripts/llm_client.py against the fake
+OpenAI server, fully offline.
+
+    python benchmarks/bench_llm_client.py --requests 200 --concurrency 16 \
+        --latency-ms 200 --error-rate 0.1
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import fake_openai_server  # noqa: E402
+
+DEFAULT_OUT = os.path.join(ROOT, "benchmarks", "results", "llm_client.json")
+
+
+async def fire(client, n):
+    messages = [
+        {"role": "system", "content": "Return strict JSON only."},
+        {"role": "user", "content": 'Return {"bathroom_issues": ...}'},
+    ]
+
+    async def one():
+        try:
+            await client.achat("gpt-4o-mini", messages)
+            return True
+        except Exception:
+            return False
+
+    return await asyncio.gather(*(one() for _ in range(n)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared async LLM client offline.")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    args = parser.parse_args()
+
+    server, url = fake_openai_server.start_server(0, args.latency_ms, args.error_rate)
+    os.environ["OPENAI_BASE_URL"] = url
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+    import llm_client
+
+    client = llm_client.AsyncLLMClient(max_concurrency=args.concurrency)
+
+    started = time.perf_counter()
+    outcomes = client.run(fire(client, args.requests))
+    elapsed = time.perf_counter() - started
+
+    server.shutdown()
+
+    result = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "latency_ms": args.latency_ms,
+        "error_rate": args.error_rate,
+        "succeeded": sum(outcomes),
+        "failed": len(outcomes) - sum(outcomes),
+        "http_requests": server.RequestHandlerClass.requests,
+        "retries": client.stats["retries"],
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(args.requests / elapsed, 2),
+    }
+
+    print(json.dumps(result, indent=2))
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Compare the old PNG handoff to EasyOCR with the NumPy view used by
+extract_text_ocr.ocr_page().
+
+Each mode runs in a fresh process so peak RSS is not shared between them.
+
+    python benchmarks/bench_ocr_handoff.py [--pdf PATH] [--pages N] [--out JSON] [--handoff-only]
+
+--handoff-only stops at easyocr.utils.reformat_input(), the conversion
+EasyOCR applies before its models, so it runs without the model weights.
+It also checks that both modes give the models identical images.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+DEFAULT_PDF = os.path.join(ROOT, "data", "Thermal Images.pdf")
+DEFAULT_OUT = os.path.join(ROOT, "benchmarks", "results", "ocr_handoff.json")
+
+MODES = ["png", "array"]
+
+
+def peak_rss_mb():
+    import resource
+
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def png_handoff(page):
+    import extract_text_ocr
+
+    pix = page.get_pixmap(dpi=extract_text_ocr.OCR_DPI)
+    return pix, pix.tobytes("png")
+
+
+def array_handoff(page):
+    import extract_text_ocr
+
+    return extract_text_ocr.render_page(page)
+
+
+def run_mode(mode, pdf, max_pages, handoff_only, queue):
+    import hashlib
+
+    import fitz
+    import extract_text_ocr
+
+    handoff = png_handoff if mode == "png" else array_handoff
+
+    if handoff_only:
+        from easyocr.utils import reformat_input
+        reader = None
+    else:
+        reader = extract_text_ocr.get_reader()
+    rss_after_reader = peak_rss_mb()
+
+    doc = fitz.open(pdf)
+    pages = min(doc.page_count, max_pages) if max_pages else doc.page_count
+
+    timings = []
+    digests = []
+    for i in range(pages):
+        page = doc.load_page(i)
+
+        t0 = time.perf_counter()
+        pix, img = handoff(page)
+        t1 = time.perf_counter()
+        if reader is None:
+            color, grey = reformat_input(img)
+            t2 = time.perf_counter()
+            digests.append(hashlib.sha256(color.tobytes() + grey.tobytes()).hexdigest())
+            del color, grey
+        else:
+            reader.readtext(img, detail=0)
+            t2 = time.perf_counter()
+
+        del img, pix
+        timings.append({
+            "page": i + 1,
+            "render_s": round(t1 - t0, 4),
+            "ocr_s": round(t2 - t1, 4),
+            "total_s": round(t2 - t0, 4),
+        })
+
+    doc.close()
+
+    totals = [t["total_s"] for t in timings]
+    queue.put({
+        "mode": mode,
+        "pages": pages,
+        "handoff_only": handoff_only,
+        "mean_page_s": round(statistics.mean(totals), 4) if totals else 0.0,
+        "median_page_s": round(statistics.median(totals), 4) if totals else 0.0,
+        "mean_render_s": round(statistics.mean(t["render_s"] for t in timings), 4) if timings else 0.0,
+        "peak_rss_after_reader_mb": round(rss_after_reader, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "model_inputs": digests,
+        "per_page": timings,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pdf", default=DEFAULT_PDF)
+    parser.add_argument("--pages", type=int, default=0, help="Limit pages (0 = all).")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--handoff-only", action="store_true",
+                        help="Stop before the models (no EasyOCR weights needed).")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+
+    for mode in MODES:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_mode, args=(mode, args.pdf, args.pages, args.handoff_only, queue))
+        proc.start()
+        result = queue.get()
+        proc.join()
+        results.append(result)
+
+        print(
+            f"{mode:>6}: {result['pages']} pages, "
+            f"mean {result['mean_page_s']:.3f}s/page "
+            f"(render+handoff {result['mean_render_s']:.3f}s), "
+            f"peak RSS {result['peak_rss_mb']:.0f} MB"
+        )
+
+    if args.handoff_only:
+        same = results[0]["model_inputs"] == results[1]["model_inputs"]
+        print(f"[INFO] Model inputs identical across modes: {same}")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"pdf": args.pdf, "results": results}, f, indent=2)
+
+    print(f"[SUCCESS] Results saved → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
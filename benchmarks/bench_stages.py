@@ -0,0 +1,255 @@
+"""
+Time every pipeline stage function on synthetic reports of 10, 100 and
+1000 pages, fully offline.
+
+The LLM extractors run against an in-process stub that answers with the
+sample outputs in data/, so the numbers cover prompt building, compaction,
+chunking, parsing and repair but not the model. OCR runs on a few
+image-only pages and is skipped when EasyOCR is not installed.
+
+    python benchmarks/bench_stages.py [--pages 10 100 1000] [--repeat 3] \
+        [--baseline benchmarks/results/stages.json] [--tolerance 0.25]
+
+With --baseline, stages slower than the baseline by more than the
+tolerance are reported and the exit status is 1.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import importlib.util
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+DEFAULT_OUT = os.path.join(ROOT, "benchmarks", "results", "stages.json")
+
+WORKDIR = tempfile.mkdtemp(prefix="bench_stages_")
+
+# Must be set before the caches are imported: every LLM call reaches the
+# stub and every OCR page is recognised.
+os.environ["LLM_CACHE_PATH"] = os.path.join(WORKDIR, "llm_cache.sqlite")
+os.environ["LLM_CACHE_BYPASS"] = "1"
+os.environ["OCR_CACHE_PATH"] = os.path.join(WORKDIR, "ocr_cache.sqlite")
+os.environ["OCR_CACHE_BYPASS"] = "1"
+
+import synthetic_pdfs  # noqa: E402
+import fake_openai_server  # noqa: E402
+import llm_client  # noqa: E402
+
+
+def stub_chat(model, messages, temperature=0):
+    prompt = messages[-1]["content"]
+    content = json.dumps(fake_openai_server.fixture_for(prompt))
+    return {
+        "content": content,
+        "prompt_tokens": fake_openai_server.estimate_tokens(prompt),
+        "completion_tokens": fake_openai_server.estimate_tokens(content),
+        "latency_s": 0.0,
+    }
+
+
+llm_client.chat = stub_chat
+
+import compact  # noqa: E402
+import extract_text  # noqa: E402
+import extract_areas  # noqa: E402
+import extract_systems  # noqa: E402
+import extract_thermal  # noqa: E402
+import merge  # noqa: E402
+import rules  # noqa: E402
+import thermal_analytics  # noqa: E402
+import thermal_images  # noqa: E402
+import extract_text_ocr  # noqa: E402
+
+# extract_text_ocr only imports easyocr once a page needs OCR.
+OCR_SKIPPED = None if importlib.util.find_spec("easyocr") else "easyocr not installed"
+
+
+def quiet(fn, *args):
+    """Run fn with its [INFO] chatter suppressed."""
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        return fn(*args)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def timed(name, pages, repeat, fn, *args):
+    timings = []
+    result = None
+
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = quiet(fn, *args)
+        timings.append(time.perf_counter() - t0)
+
+    best = min(timings)
+    row = {
+        "stage": name,
+        "pages": pages,
+        "runs": repeat,
+        "best_s": round(best, 5),
+        "median_s": round(statistics.median(timings), 5),
+        "pages_per_s": round(pages / best, 1) if best else None,
+    }
+    print(f"{pages:>5} pages  {name:<28} best {best:8.4f}s  median {row['median_s']:8.4f}s")
+    return row, result
+
+
+def skipped(name, pages, reason):
+    print(f"{pages:>5} pages  {name:<28} skipped ({reason})")
+    return {"stage": name, "pages": pages, "skipped": reason}
+
+
+def with_references(thermal, areas, seed=0):
+    """Point readings at areas the way an LLM-filled area_reference would."""
+    rng = random.Random(seed)
+    names = [a["area_name"] for a in areas] + ["Not Available"]
+    readings = [dict(r, area_reference=rng.choice(names)) for r in thermal["thermal_readings"]]
+    return {"thermal_readings": readings}
+
+
+def bench_size(pages, repeat, ocr_pages):
+    inspection_pdf = synthetic_pdfs.make_inspection_pdf(
+        os.path.join(WORKDIR, f"inspection_{pages}.pdf"), pages)
+    thermal_pdf = synthetic_pdfs.make_thermal_pdf(
+        os.path.join(WORKDIR, f"thermal_{pages}.pdf"), pages)
+
+    inspection_txt = os.path.join(WORKDIR, f"inspection_{pages}.txt")
+    rows = []
+
+    row, _ = timed("extract_text_from_pdf", pages, repeat,
+                   extract_text.extract_text_from_pdf, inspection_pdf, inspection_txt)
+    rows.append(row)
+
+    with open(inspection_txt, "r", encoding="utf-8") as f:
+        inspection_text = f.read()
+
+    row, (thermal_text, _) = timed("extract_pdf_text", pages, repeat,
+                                   extract_text_ocr.extract_pdf_text, thermal_pdf)
+    rows.append(row)
+
+    n = min(pages, ocr_pages)
+    if OCR_SKIPPED is None:
+        scanned = synthetic_pdfs.make_scanned_pdf(os.path.join(WORKDIR, f"scanned_{n}.pdf"), n)
+        row, _ = timed("extract_with_fallback (OCR)", n, 1, extract_text_ocr.extract_with_fallback,
+                       scanned, os.path.join(WORKDIR, f"scanned_{n}.txt"))
+        rows.append(row)
+    else:
+        rows.append(skipped("extract_with_fallback (OCR)", n, OCR_SKIPPED))
+
+    row, _ = timed("compact_inspection_text", pages, repeat, compact.compact_inspection_text, inspection_text)
+    rows.append(row)
+
+    row, areas = timed("extract_areas (stub LLM)", pages, repeat, extract_areas.extract_areas, inspection_text)
+    rows.append(row)
+
+    row, systems = timed("extract_systems (stub LLM)", pages, repeat, extract_systems.extract_systems, inspection_text)
+    rows.append(row)
+
+    row, thermal = timed("extract_thermal", pages, repeat, extract_thermal.extract_thermal, thermal_text)
+    rows.append(row)
+
+    row, _ = timed("extract_images", pages, repeat, thermal_images.extract_images, thermal_pdf, thermal_text,
+                   os.path.join(WORKDIR, "images"), os.path.join(WORKDIR, f"thermal_images_{pages}.json"))
+    rows.append(row)
+
+    thermal = with_references(thermal, areas["areas"])
+
+    def attach():
+        return merge.attach_thermal([dict(a) for a in areas["areas"]], thermal)
+
+    row, attached = timed("attach_thermal", pages, repeat, attach)
+    rows.append(row)
+
+    plan = rules.default_plan()
+    row, _ = timed("rules.evaluate", pages, repeat, rules.evaluate, plan, [(attached, systems)])
+    rows.append(row)
+
+    row, _ = timed("thermal_analytics.summarise", pages, repeat, thermal_analytics.summarise,
+                   thermal["thermal_readings"], {a["area_name"]: a["thermal_images"] for a in attached})
+    rows.append(row)
+
+    def build():
+        return merge.build_diagnostic({"areas": [dict(a) for a in areas["areas"]]}, systems, thermal)
+
+    row, _ = timed("build_diagnostic", pages, repeat, build)
+    rows.append(row)
+
+    return rows
+
+
+def compare(rows, baseline_path, tolerance):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {
+            (r["stage"], r["pages"]): r
+            for r in json.load(f)["results"]
+            if "best_s" in r
+        }
+
+    regressions = []
+    for r in rows:
+        base = baseline.get((r["stage"], r["pages"]))
+        if not base or "best_s" not in r or not base["best_s"]:
+            continue
+
+        ratio = r["best_s"] / base["best_s"]
+        r["baseline_best_s"] = base["best_s"]
+        r["ratio"] = round(ratio, 3)
+
+        if ratio > 1 + tolerance:
+            regressions.append(r)
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic PDFs.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ocr-pages", type=int, default=3,
+                        help="Image-only pages to OCR per size (EasyOCR is slow on CPU).")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    args = parser.parse_args()
+
+    rows = []
+    for pages in args.pages:
+        rows += bench_size(pages, args.repeat, args.ocr_pages)
+
+    regressions = compare(rows, args.baseline, args.tolerance) if args.baseline else []
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": rows,
+    }
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"[SUCCESS] Results saved → {args.out}")
+
+    for r in regressions:
+        print(f"[WARNING] {r['stage']} @ {r['pages']} pages: {r['best_s']}s vs "
+              f"{r['baseline_best_s']}s baseline ({r['ratio']}x)")
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare the fitz and pdfplumber backends of extract_text.py.
+
+    python benchmarks/bench_text_backends.py [--pdf PATH] [--repeat N] [--out JSON]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import extract_text  # noqa: E402
+
+DEFAULT_PDF = os.path.join(ROOT, "data", "Sample Report.pdf")
+DEFAULT_OUT = os.path.join(ROOT, "benchmarks", "results", "text_backends.json")
+
+
+def new_report():
+    return {
+        "pages_total": 0,
+        "pages_with_text": 0,
+        "pages_empty": 0,
+        "characters_extracted": 0,
+        "pages_escalated": 0,
+    }
+
+
+def run_backend(pdf, backend, repeat):
+    timings = []
+
+    for _ in range(repeat):
+        report = new_report()
+
+        t0 = time.perf_counter()
+        for _page in extract_text.iter_pages(pdf, report, backend):
+            pass
+        timings.append(time.perf_counter() - t0)
+
+    best = min(timings)
+    return {
+        "backend": backend,
+        "runs": repeat,
+        "best_s": round(best, 4),
+        "median_s": round(statistics.median(timings), 4),
+        "pages_per_s": round(report["pages_total"] / best, 1) if best else 0.0,
+        **report,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pdf", default=DEFAULT_PDF)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    args = parser.parse_args()
+
+    results = [run_backend(args.pdf, b, args.repeat) for b in ("pdfplumber", "fitz")]
+
+    for r in results:
+        print(
+            f"{r['backend']:>10}: best {r['best_s']:.3f}s, median {r['median_s']:.3f}s, "
+            f"{r['pages_per_s']} pages/s, {r['characters_extracted']} chars, "
+            f"{r['pages_escalated']} escalated"
+        )
+
+    if results[1]["best_s"]:
+        print(f"Speed-up: {results[0]['best_s'] / results[1]['best_s']:.1f}x")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"pdf": args.pdf, "results": results}, f, indent=2)
+
+    print(f"[SUCCESS] Results saved → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Minimal stand-in for the OpenAI chat completions endpoint, for running the
+pipeline and the LLM client offline.
+
+Replies are the committed sample outputs in data/ (areas.json, systems.json,
+thermal.json, or areas + systems for the combined prompt), chosen by the
+schema the prompt asks for. Latency and
+failures can be injected:
+
+    python benchmarks/fake_openai_server.py --port 8765 --latency-ms 300 --error-rate 0.2
+
+Point the pipeline at it with:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake python run_pipeline.py
+"""
+import os
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, "data")
+
+
+def load_fixture(name):
+    with open(os.path.join(DATA_DIR, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def fixture_for(prompt: str) -> dict:
+    if '"areas"' in prompt and '"bathroom_issues"' in prompt:
+        return {**load_fixture("areas.json"), **load_fixture("systems.json")}
+
+    if '"thermal_readings"' in prompt:
+        return load_fixture("thermal.json")
+
+    if '"bathroom_issues"' in prompt:
+        return load_fixture("systems.json")
+
+    if '"areas"' in prompt:
+        return load_fixture("areas.json")
+
+    return {}
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    error_rate = 0.0
+    requests = 0
+    lock = threading.Lock()
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        with self.lock:
+            type(self).requests += 1
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if random.random() < self.error_rate:
+            if random.random() < 0.5:
+                self._send(429, {"error": {"message": "Rate limited"}}, {"Retry-After": "0.1"})
+            else:
+                self._send(500, {"error": {"message": "Injected server error"}})
+            return
+
+        messages = request.get("messages", [])
+        prompt = "\n".join(m.get("content", "") for m in messages)
+        content = json.dumps(fixture_for(prompt))
+
+        self._send(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": estimate_tokens(prompt),
+                "completion_tokens": estimate_tokens(content),
+                "total_tokens": estimate_tokens(prompt) + estimate_tokens(content),
+            },
+        })
+
+
+def start_server(port=0, latency_ms=0.0, error_rate=0.0):
+    """Start the fake server on a background thread; returns (server, base_url)."""
+    handler = type("Handler", (FakeOpenAIHandler,), {
+        "latency": latency_ms / 1000,
+        "error_rate": error_rate,
+        "requests": 0,
+    })
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completions server.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = start_server(args.port, args.latency_ms, args.error_rate)
+    print(f"[INFO] Fake OpenAI server listening on {url}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
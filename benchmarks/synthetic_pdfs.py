@@ -0,0 +1,154 @@
+"""
+Synthetic inspection and thermal PDFs at any page count, built with fitz
+from the layout of the sample reports in data/.
+
+    python benchmarks/synthetic_pdfs.py --pages 100 --out-dir /tmp/synthetic
+"""
+import os
+import random
+import argparse
+
+import fitz
+
+AREAS = [
+    "Hall", "Bedroom", "Master Bedroom", "Kitchen", "Common Bathroom",
+    "Master Bathroom", "Parking Area", "Terrace", "Balcony", "Staircase",
+]
+
+DEFECTS = ["Skirting level Dampness", "Ceiling leakage", "Wall plaster cracks", "Efflorescence"]
+SOURCES = ["Common Bathroom tile hollowness", "Terrace slope disturbance", "External wall cracks"]
+
+FONT_SIZE = 9
+LINE_HEIGHT = 12
+MARGIN = 50
+
+
+def _write_lines(page, lines):
+    y = MARGIN
+    for line in lines:
+        page.insert_text((MARGIN, y), line, fontsize=FONT_SIZE)
+        y += LINE_HEIGHT
+
+
+def inspection_lines(i, rng):
+    if i == 0:
+        return [
+            "Inspection Form",
+            "Complete",
+            "Property Type: Flat",
+            "Floors: 11",
+            "Inspection Date and Time: 27.09.2022 14:28 IST",
+            "Inspected By: Synthetic",
+        ]
+
+    lines = ["Checklists / Inspection Checklists"]
+    for n in range(3):
+        area = rng.choice(AREAS)
+        lines += [
+            f"Impacted Area {3 * i + n + 1}",
+            f"Negative side Description {area} {rng.choice(DEFECTS)}",
+            "Negative side photographs",
+            " ".join(f"Photo {k}" for k in range(1, rng.randint(2, 8))),
+            f"Positive side Description {rng.choice(SOURCES)}",
+            "Positive side photographs",
+        ]
+    lines += [
+        "Bathroom: Gaps/Blackish dirt Observed in tile joints: Yes",
+        "External wall: Cracks observed: Yes",
+        "Parking: Leakage from ceiling: No",
+    ]
+    return lines
+
+
+def thermal_lines(i, rng):
+    hot = round(rng.uniform(24, 32), 1)
+    cold = round(hot - rng.uniform(0.5, 7), 1)
+    return [
+        f"{hot} °C",
+        f"{cold} °C",
+        "27/09/22",
+        "Hotspot :",
+        f"{hot} °C",
+        "Coldspot :",
+        f"{cold} °C",
+        "Emissivity :",
+        "0.94",
+        "Reflected temperature :",
+        "23 °C",
+        f"Thermal image : RB{i:05d}X.JPG",
+        "Device : GTC 400 C Professional",
+        "Serial Number : 02700034772",
+        str(i + 1),
+    ]
+
+
+def thermal_image(width=320, height=240, seed=0):
+    """A small grayscale JPEG standing in for the camera image."""
+    rng = random.Random(seed)
+    pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, width, height), False)
+    pix.set_rect(pix.irect, (rng.randint(40, 200),))
+    return pix.tobytes("jpeg")
+
+
+def make_inspection_pdf(path, pages, seed=0):
+    rng = random.Random(seed)
+    doc = fitz.open()
+
+    for i in range(pages):
+        _write_lines(doc.new_page(), inspection_lines(i, rng))
+
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def make_thermal_pdf(path, pages, seed=0, images=True):
+    rng = random.Random(seed)
+    doc = fitz.open()
+
+    for i in range(pages):
+        page = doc.new_page()
+        _write_lines(page, thermal_lines(i, rng))
+
+        if images:
+            rect = fitz.Rect(MARGIN + 250, MARGIN, MARGIN + 250 + 240, MARGIN + 180)
+            page.insert_image(rect, stream=thermal_image(seed=seed + i))
+
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def make_scanned_pdf(path, pages, seed=0, dpi=150):
+    """Thermal pages rasterised to image-only pages, so OCR has to read them."""
+    source = fitz.open()
+    rng = random.Random(seed)
+    for i in range(pages):
+        _write_lines(source.new_page(), thermal_lines(i, rng))
+
+    doc = fitz.open()
+    for page in source:
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        out = doc.new_page(width=page.rect.width, height=page.rect.height)
+        out.insert_image(out.rect, stream=pix.tobytes("png"))
+
+    doc.save(path)
+    doc.close()
+    source.close()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--out-dir", default=".")
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for name, make in (("inspection", make_inspection_pdf), ("thermal", make_thermal_pdf)):
+        path = make(os.path.join(args.out_dir, f"{name}_{args.pages}.pdf"), args.pages)
+        print(f"[SUCCESS] {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import run_pipeline
+
+
+OCR_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+LLM_WORKERS = 8
+
+SUMMARY_NAME = "batch_summary.json"
+LOG_NAME = "pipeline.log"
+TRACE_NAME = "trace.jsonl"
+CHROME_TRACE_NAME = "trace.chrome.json"
+
+
+# -----------------------------
+# Job discovery
+# -----------------------------
+
+def load_manifest(path):
+    """
+    Read building jobs from a JSON list or a CSV file. Each entry needs
+    building_id, inspection_pdf and thermal_pdf. Relative PDF paths are
+    resolved against the manifest's directory.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"[ERROR] Manifest not found: {path}")
+
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = json.load(f)
+
+    base = os.path.dirname(os.path.abspath(path))
+    jobs = []
+
+    for idx, row in enumerate(rows):
+        missing = {"building_id", "inspection_pdf", "thermal_pdf"} - row.keys()
+        if missing:
+            raise ValueError(f"[ERROR] Manifest entry {idx} missing keys: {missing}")
+
+        jobs.append({
+            "building_id": str(row["building_id"]),
+            "inspection_pdf": os.path.join(base, row["inspection_pdf"]),
+            "thermal_pdf": os.path.join(base, row["thermal_pdf"]),
+        })
+
+    return jobs
+
+
+def discover_jobs(input_dir):
+    """
+    One building per sub-directory holding exactly two PDFs. The PDF with
+    "thermal" in its file name is the thermal report, the other one is the
+    inspection report.
+    """
+    if not os.path.isdir(input_dir):
+        raise ValueError(f"[ERROR] Not a directory: {input_dir}")
+
+    jobs = []
+
+    for name in sorted(os.listdir(input_dir)):
+        folder = os.path.join(input_dir, name)
+        if not os.path.isdir(folder):
+            continue
+
+        pdfs = sorted(f for f in os.listdir(folder) if f.lower().endswith(".pdf"))
+        thermal = [f for f in pdfs if "thermal" in f.lower()]
+        inspection = [f for f in pdfs if "thermal" not in f.lower()]
+
+        if len(thermal) != 1 or len(inspection) != 1:
+            print(f"[WARNING] Skipping {folder}: expected one inspection and one thermal PDF")
+            continue
+
+        jobs.append({
+            "building_id": name,
+            "inspection_pdf": os.path.join(folder, inspection[0]),
+            "thermal_pdf": os.path.join(folder, thermal[0]),
+        })
+
+    return jobs
+
+
+def is_complete(out_dir):
+    path = os.path.join(out_dir, "diagnostic.json")
+
+    if not os.path.exists(path):
+        return False
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return "overall" in json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return False
+
+
+# -----------------------------
+# Worker
+# -----------------------------
+
+def init_worker(ocr_limit, llm_limit):
+    run_pipeline.LIMITS["ocr"] = ocr_limit
+    run_pipeline.LIMITS["llm"] = llm_limit
+
+
+def process_building(job, out_root, use_cache, combined, trace=False):
+    out_dir = os.path.join(out_root, job["building_id"])
+    os.makedirs(out_dir, exist_ok=True)
+
+    paths = run_pipeline.build_paths(job["inspection_pdf"], job["thermal_pdf"], out_dir, job["building_id"])
+    started = time.perf_counter()
+
+    # Per-building logs keep concurrent pipelines from interleaving output.
+    with open(os.path.join(out_dir, LOG_NAME), "w", encoding="utf-8") as log:
+        with contextlib.redirect_stdout(log):
+            try:
+                run_pipeline.run_pipeline(
+                    paths,
+                    use_cache=use_cache,
+                    combined=combined,
+                    trace_path=os.path.join(out_dir, TRACE_NAME) if trace else None,
+                    chrome_trace_path=os.path.join(out_dir, CHROME_TRACE_NAME) if trace else None,
+                )
+                error = None
+            except Exception as e:
+                print(e)
+                error = str(e)
+
+    return {
+        "building_id": job["building_id"],
+        "status": "failed" if error else "done",
+        "seconds": round(time.perf_counter() - started, 2),
+        "error": error,
+    }
+
+
+# -----------------------------
+# Batch driver
+# -----------------------------
+
+def run_batch(jobs, out_root, jobs_limit, ocr_workers, llm_workers, use_cache=True, combined=False,
+              trace=False):
+    os.makedirs(out_root, exist_ok=True)
+
+    results = []
+    todo = []
+
+    for job in jobs:
+        if is_complete(os.path.join(out_root, job["building_id"])):
+            results.append({
+                "building_id": job["building_id"],
+                "status": "skipped",
+                "seconds": 0.0,
+                "error": None,
+            })
+        else:
+            todo.append(job)
+
+    print(f"[INFO] {len(jobs)} buildings, {len(jobs) - len(todo)} already complete")
+
+    started = time.perf_counter()
+
+    if todo:
+        ctx = multiprocessing.get_context()
+        ocr_limit = ctx.BoundedSemaphore(ocr_workers)
+        llm_limit = ctx.BoundedSemaphore(llm_workers)
+
+        with ProcessPoolExecutor(
+            max_workers=jobs_limit,
+            mp_context=ctx,
+            initializer=init_worker,
+            initargs=(ocr_limit, llm_limit),
+        ) as pool:
+            futures = {
+                pool.submit(process_building, job, out_root, use_cache, combined, trace): job
+                for job in todo
+            }
+
+            for future in as_completed(futures):
+                job = futures[future]
+
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {
+                        "building_id": job["building_id"],
+                        "status": "failed",
+                        "seconds": 0.0,
+                        "error": f"[ERROR] Worker crashed: {e}",
+                    }
+
+                results.append(result)
+                print(f"[BATCH] {result['building_id']}: {result['status']} ({result['seconds']}s)")
+
+    elapsed = time.perf_counter() - started
+    processed = [r for r in results if r["status"] == "done"]
+
+    summary = {
+        "buildings_total": len(jobs),
+        "buildings_done": len(processed),
+        "buildings_skipped": sum(r["status"] == "skipped" for r in results),
+        "buildings_failed": sum(r["status"] == "failed" for r in results),
+        "elapsed_seconds": round(elapsed, 2),
+        "buildings_per_minute": round(len(processed) / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        "failures": {r["building_id"]: r["error"] for r in results if r["status"] == "failed"},
+        "buildings": sorted(results, key=lambda r: r["building_id"]),
+    }
+
+    with open(os.path.join(out_root, SUMMARY_NAME), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the DDR pipeline over many buildings.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="JSON or CSV list of building_id, inspection_pdf, thermal_pdf.")
+    source.add_argument("--input-dir", help="Directory with one sub-directory of PDFs per building.")
+    parser.add_argument("--out-dir", required=True, help="Root directory for per-building outputs.")
+    parser.add_argument("--ocr-workers", type=int, default=OCR_WORKERS,
+                        help=f"Concurrent text/OCR stages across the batch (default {OCR_WORKERS}).")
+    parser.add_argument("--llm-workers", type=int, default=LLM_WORKERS,
+                        help=f"Concurrent LLM stages across the batch (default {LLM_WORKERS}).")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Buildings processed at once (default: ocr + llm workers).")
+    parser.add_argument("--force", action="store_true", help="Ignore per-building stage caches.")
+    parser.add_argument("--combined", action="store_true",
+                        help="Extract areas and systems with a single LLM call.")
+    parser.add_argument("--trace", action="store_true",
+                        help=f"Write {TRACE_NAME} and {CHROME_TRACE_NAME} per building.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    jobs = load_manifest(args.manifest) if args.manifest else discover_jobs(args.input_dir)
+
+    if not jobs:
+        print("[ERROR] No buildings to process.")
+        sys.exit(1)
+
+    jobs_limit = args.jobs or (args.ocr_workers + args.llm_workers)
+
+    summary = run_batch(
+        jobs,
+        args.out_dir,
+        jobs_limit,
+        args.ocr_workers,
+        args.llm_workers,
+        use_cache=not args.force,
+        combined=args.combined,
+        trace=args.trace,
+    )
+
+    print("\n========== BATCH COMPLETE ==========\n")
+    print(f"Done: {summary['buildings_done']}  Skipped: {summary['buildings_skipped']}  "
+          f"Failed: {summary['buildings_failed']}")
+    print(f"Elapsed: {summary['elapsed_seconds']}s  ({summary['buildings_per_minute']} buildings/min)")
+
+    for building, error in summary["failures"].items():
+        print(f"[FAILED] {building}: {error}")
+
+    print(f"Summary → {os.path.join(args.out_dir, SUMMARY_NAME)}")
+
+    if summary["buildings_failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Submit a building to a running run_server.py and wait for its diagnostic.
+
+    python run_client.py <inspection_pdf> <thermal_pdf> [--building-id ID] \
+        [--url http://127.0.0.1:8750] [--out diagnostic.json] [--no-wait]
+
+A full queue (429) is retried after the server's Retry-After.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import urllib.error
+import urllib.request
+
+DEFAULT_URL = "http://127.0.0.1:8750"
+MAX_SUBMIT_ATTEMPTS = 20
+
+
+def post_job(url, job, wait):
+    request = urllib.request.Request(
+        f"{url.rstrip('/')}/jobs" + ("?wait=1" if wait else ""),
+        data=json.dumps(job).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+
+    for attempt in range(MAX_SUBMIT_ATTEMPTS):
+        try:
+            with urllib.request.urlopen(request) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            if e.code != 429:
+                body = json.load(e) if e.headers.get("Content-Type") == "application/json" else {}
+                raise RuntimeError(body.get("error") or f"[ERROR] Server returned {e.code}") from e
+
+            delay = float(e.headers.get("Retry-After") or 5)
+            print(f"[INFO] Server queue full, retrying in {delay:.0f}s")
+            time.sleep(delay)
+
+    raise RuntimeError(f"[ERROR] Server queue still full after {MAX_SUBMIT_ATTEMPTS} attempts.")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Submit a DDR job to run_server.py.")
+    parser.add_argument("inspection_pdf")
+    parser.add_argument("thermal_pdf")
+    parser.add_argument("--building-id")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--combined", action="store_true")
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--out", help="Also write the diagnostic here.")
+    parser.add_argument("--no-wait", action="store_true", help="Return once the job is queued.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    job = {
+        # The server resolves paths itself, so send them absolute.
+        "inspection_pdf": os.path.abspath(args.inspection_pdf),
+        "thermal_pdf": os.path.abspath(args.thermal_pdf),
+        "building_id": args.building_id,
+        "combined": args.combined,
+        "force": args.force,
+    }
+
+    started = time.perf_counter()
+
+    try:
+        result = post_job(args.url, job, wait=not args.no_wait)
+    except (RuntimeError, urllib.error.URLError) as e:
+        print(e)
+        sys.exit(1)
+
+    if args.no_wait:
+        print(f"[INFO] Queued job {result['job_id']}")
+        return
+
+    print(f"[INFO] Job {result['job_id']} {result['status']} "
+          f"({result['seconds']}s on server, {time.perf_counter() - started:.2f}s end to end)")
+
+    if result["status"] != "done":
+        print(result["error"])
+        sys.exit(1)
+
+    print(f"Final output → {os.path.join(result['out_dir'], 'diagnostic.json')}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result["diagnostic"], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
-import subprocess
 import sys
 import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 SCRIPTS_DIR = "scripts"
 DATA_DIR = "data"
@@ -16,62 +18,439 @@ SYSTEMS_JSON = os.path.join(DATA_DIR, "systems.json")
 THERMAL_JSON = os.path.join(DATA_DIR, "thermal.json")
 DIAGNOSTIC_JSON = os.path.join(DATA_DIR, "diagnostic.json")
 
+# Independent branches (inspection text vs thermal OCR, and the three LLM
+# extractors) run side by side. OCR and LLM calls release the GIL while
+# they wait, so threads are enough here.
+MAX_WORKERS = 4
 
-def run(cmd):
-    print(f"\n PIPELINE Running: {' '.join(cmd)}")
-    # Always use the current venv interpreter
-    result = subprocess.run([sys.executable] + cmd)
-    if result.returncode != 0:
-        print("[PIPELINE ERROR] Step failed.")
-        sys.exit(1)
+# Optional resource limiters ("ocr", "llm") shared with other pipelines in
+# the same batch. run_batch.py installs cross-process semaphores here.
+LIMITS = {}
+
+# Stage modules live in scripts/ and are imported directly so the
+# interpreter, torch and the OpenAI SDK are only loaded once per run.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), SCRIPTS_DIR))
+
+import extract_text  # noqa: E402
+import extract_text_ocr  # noqa: E402
+import extract_areas  # noqa: E402
+import extract_systems  # noqa: E402
+import extract_thermal  # noqa: E402
+import extract_inspection  # noqa: E402
+import merge  # noqa: E402
+import diagnostic_store  # noqa: E402
+import stage_cache  # noqa: E402
+import page_stream  # noqa: E402
+import chunking  # noqa: E402
+import compact  # noqa: E402
+import repair  # noqa: E402
+import rules  # noqa: E402
+import thermal_analytics  # noqa: E402
+import thermal_images  # noqa: E402
+import llm_cache  # noqa: E402
+import ocr_cache  # noqa: E402
+import tracing  # noqa: E402
+
+
+class PipelineError(RuntimeError):
+    pass
+
+
+def build_paths(inspection_pdf, thermal_pdf, out_dir, building_id=None):
+    return {
+        # Name the building is stored under in DIAGNOSTIC_STORE; None falls
+        # back to the output directory name.
+        "building_id": building_id,
+        "inspection_pdf": inspection_pdf,
+        "thermal_pdf": thermal_pdf,
+        "inspection_txt": os.path.join(out_dir, "inspection.txt"),
+        "thermal_txt": os.path.join(out_dir, "thermal.txt"),
+        "areas_json": os.path.join(out_dir, "areas.json"),
+        "systems_json": os.path.join(out_dir, "systems.json"),
+        "inspection_json": os.path.join(out_dir, "inspection.json"),
+        "thermal_json": os.path.join(out_dir, "thermal.json"),
+        "thermal_images_json": os.path.join(out_dir, "thermal_images.json"),
+        "image_store": thermal_images.IMAGE_STORE or os.path.join(out_dir, "images"),
+        "diagnostic_json": os.path.join(out_dir, "diagnostic.json"),
+    }
+
+
+# -----------------------------
+# Stages
+# -----------------------------
+
+def stage_inspection_text(paths, results):
+    extract_text.extract_text_from_pdf(paths["inspection_pdf"], paths["inspection_txt"])
+    return page_stream.read_text(paths["inspection_txt"])
+
+
+def stage_thermal_text(paths, results):
+    extract_text_ocr.extract_with_fallback(paths["thermal_pdf"], paths["thermal_txt"])
+    return page_stream.read_text(paths["thermal_txt"])
+
+
+def stage_areas(paths, results):
+    areas = extract_areas.extract_areas(results["inspection_text"])
+    print(f"[INFO] Extracted {len(areas['areas'])} areas.")
+    extract_areas.save_json(areas, paths["areas_json"])
+    return areas
+
+
+def stage_systems(paths, results):
+    systems = extract_systems.extract_systems(results["inspection_text"])
+    extract_systems.save(systems, paths["systems_json"])
+    return systems
+
+
+def stage_inspection_combined(paths, results):
+    areas, systems = extract_inspection.extract_inspection(results["inspection_text"])
+    print(f"[INFO] Extracted {len(areas['areas'])} areas.")
+    extract_inspection.save(areas, systems, paths["inspection_json"])
+    return {"areas": areas, "systems": systems}
+
+
+def stage_areas_combined(paths, results):
+    areas = results["inspection"]["areas"]
+    extract_areas.save_json(areas, paths["areas_json"])
+    return areas
+
+
+def stage_systems_combined(paths, results):
+    systems = results["inspection"]["systems"]
+    extract_systems.save(systems, paths["systems_json"])
+    return systems
+
+
+def stage_thermal(paths, results):
+    thermal = extract_thermal.extract_thermal(results["thermal_text"])
+    print(f"[INFO] Extracted {len(thermal['thermal_readings'])} readings.")
+    extract_thermal.save(thermal, paths["thermal_json"])
+    return thermal
+
+
+def stage_thermal_images(paths, results):
+    return thermal_images.extract_images(
+        paths["thermal_pdf"], results["thermal_text"], paths["image_store"], paths["thermal_images_json"]
+    )
+
+
+def stage_merge(paths, results):
+    diagnostic = merge.build_diagnostic(
+        results["areas"], results["systems"], results["thermal"], results["thermal_images"]
+    )
+    merge.save_json(diagnostic, paths["diagnostic_json"])
+    diagnostic_store.store(diagnostic, paths["diagnostic_json"], results["thermal"], paths["building_id"])
+    return diagnostic
+
+
+# Each stage declares the files its cache key is built from, the artifact
+# it writes and the modules whose source acts as its code version.
+STAGES = {
+    "inspection_text": {
+        "deps": [],
+        "run": stage_inspection_text,
+        "inputs": ["inspection_pdf"],
+        "output": "inspection_txt",
+        "code": [extract_text, page_stream],
+        "settings": lambda: {"backend": extract_text.TEXT_BACKEND},
+        "resource": "ocr",
+    },
+    "thermal_text": {
+        "deps": [],
+        "run": stage_thermal_text,
+        "inputs": ["thermal_pdf"],
+        "output": "thermal_txt",
+        "code": [extract_text_ocr, page_stream],
+        "resource": "ocr",
+    },
+    "areas": {
+        "deps": ["inspection_text"],
+        "run": stage_areas,
+        "inputs": ["inspection_txt"],
+        "output": "areas_json",
+        "code": [extract_areas, chunking, compact, repair],
+        "settings": lambda: {"chunk_tokens": chunking.CHUNK_TOKENS},
+        "resource": "llm",
+        "llm": extract_areas,
+    },
+    "systems": {
+        "deps": ["inspection_text"],
+        "run": stage_systems,
+        "inputs": ["inspection_txt"],
+        "output": "systems_json",
+        "code": [extract_systems, chunking, compact, repair],
+        "settings": lambda: {"chunk_tokens": chunking.CHUNK_TOKENS},
+        "resource": "llm",
+        "llm": extract_systems,
+    },
+    "thermal": {
+        "deps": ["thermal_text"],
+        "run": stage_thermal,
+        "inputs": ["thermal_txt"],
+        "output": "thermal_json",
+        "code": [extract_thermal, compact, repair, thermal_analytics],
+        "settings": lambda: {"moisture_threshold": thermal_analytics.MOISTURE_THRESHOLD},
+        "resource": "llm",
+        "llm": extract_thermal,
+    },
+    "thermal_images": {
+        "deps": ["thermal_text"],
+        "run": stage_thermal_images,
+        "inputs": ["thermal_pdf", "thermal_txt"],
+        "output": "thermal_images_json",
+        "code": [thermal_images, extract_text_ocr, extract_thermal],
+        "settings": lambda: {
+            "min_image_pixels": thermal_images.MIN_IMAGE_PIXELS,
+            "store": thermal_images.IMAGE_STORE,
+        },
+    },
+    "merge": {
+        "deps": ["areas", "systems", "thermal", "thermal_images"],
+        "run": stage_merge,
+        "inputs": ["areas_json", "systems_json", "thermal_json", "thermal_images_json"],
+        "output": "diagnostic_json",
+        "code": [merge, rules, thermal_analytics, diagnostic_store],
+        "settings": lambda: {
+            "moisture_threshold": thermal_analytics.MOISTURE_THRESHOLD,
+            "fuzzy_match": merge.FUZZY_MATCH,
+            "min_match_score": merge.MIN_MATCH_SCORE,
+            "store": diagnostic_store.STORE_PATH,
+        },
+    },
+}
+
+
+# --combined: one LLM call returns both areas and systems. The "inspection"
+# stage makes it once; areas and systems only split its result into the
+# usual files.
+COMBINED_STAGES = dict(
+    STAGES,
+    inspection={
+        "deps": ["inspection_text"],
+        "run": stage_inspection_combined,
+        "inputs": ["inspection_txt"],
+        "output": "inspection_json",
+        "code": [extract_inspection, extract_areas, extract_systems, chunking, compact, repair],
+        "settings": lambda: {"chunk_tokens": chunking.CHUNK_TOKENS},
+        "resource": "llm",
+        "llm": extract_inspection,
+    },
+    areas={
+        "deps": ["inspection"],
+        "run": stage_areas_combined,
+        "inputs": ["inspection_json"],
+        "output": "areas_json",
+        "code": [extract_areas],
+    },
+    systems={
+        "deps": ["inspection"],
+        "run": stage_systems_combined,
+        "inputs": ["inspection_json"],
+        "output": "systems_json",
+        "code": [extract_systems],
+    },
+)
+
+
+# -----------------------------
+# Stage cache
+# -----------------------------
+
+def compute_key(spec, paths):
+    parts = [
+        [os.path.basename(paths[i]), stage_cache.file_digest(paths[i])]
+        for i in spec["inputs"]
+    ]
+    parts += [[m.__name__, stage_cache.source_digest(m)] for m in spec["code"]]
+
+    if "settings" in spec:
+        parts.append(["settings", spec["settings"]()])
+
+    llm = spec.get("llm")
+    if llm:
+        parts.append(["model", llm.MODEL_NAME])
+        parts.append(["prompt", stage_cache.text_digest(llm.build_prompt(""))])
+
+    return stage_cache.stage_key(parts)
+
+
+def load_output(path):
+    if path.endswith(".json"):
+        return merge.load_json(path)
+
+    return page_stream.read_text(path)
+
+
+def execute_stage(name, spec, paths, results, manifest, use_cache):
+    key = compute_key(spec, paths)
+    output_path = paths[spec["output"]]
+
+    if use_cache and stage_cache.is_fresh(manifest, name, key, output_path):
+        print(f"[CACHE] {name} unchanged → reusing {output_path}")
+        tracing.event("stage_cache_hit", "cache", stage=name)
+        return load_output(output_path), key, True
+
+    limiter = LIMITS.get(spec.get("resource"))
+
+    with tracing.span(f"stage {name}", "stage", stage=name) as info:
+        if limiter is None:
+            return spec["run"](paths, results), key, False
+
+        # Time spent waiting for a batch-wide OCR/LLM slot is not work.
+        queued = time.perf_counter()
+        with limiter:
+            info["queued_s"] = round(time.perf_counter() - queued, 4)
+            return spec["run"](paths, results), key, False
+
+
+# -----------------------------
+# DAG executor
+# -----------------------------
+
+def run_dag(stages, paths, max_workers=MAX_WORKERS, use_cache=True):
+    out_dir = os.path.dirname(paths["diagnostic_json"])
+    manifest = stage_cache.load_manifest(out_dir)
+
+    results = {}
+    pending = dict(stages)
+    running = {}
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    try:
+        while pending or running:
+            for name in list(pending):
+                spec = pending[name]
+
+                if all(d in results for d in spec["deps"]):
+                    del pending[name]
+                    print(f"\n PIPELINE Running: {name}")
+                    future = pool.submit(
+                        execute_stage, name, spec, paths, results, manifest, use_cache
+                    )
+                    running[future] = (name, time.perf_counter())
+
+            if not running:
+                raise PipelineError(
+                    f"[PIPELINE ERROR] Unresolvable dependencies: {sorted(pending)}"
+                )
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name, started = running.pop(future)
+
+                try:
+                    result, key, cached = future.result()
+                except Exception as e:
+                    # Drop queued stages now, before a freed thread picks one up.
+                    busy = [f for f in running if not f.cancel()]
+                    if busy:
+                        print(f" PIPELINE Waiting for {len(busy)} running stage(s) after '{name}' failed")
+                    raise PipelineError(
+                        f"[PIPELINE ERROR] Step '{name}' failed: {e}"
+                    ) from e
+
+                results[name] = result
+
+                if not cached:
+                    stage_cache.record(manifest, name, key, paths[stages[name]["output"]])
+                    stage_cache.save_manifest(manifest, out_dir)
+
+                elapsed = time.perf_counter() - started
+                status = "cached" if cached else f"{elapsed:.2f}s"
+                print(f" PIPELINE Finished: {name} ({status})")
+    finally:
+        # Stages that have not started are dropped; running ones are waited
+        # for, so none outlives the run (writing artifacts, holding a LIMITS
+        # slot or printing into a closed batch log).
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    return results
+
+
+def run_pipeline(paths, max_workers=MAX_WORKERS, use_cache=True, combined=False,
+                 trace_path=None, chrome_trace_path=None):
+    out_dir = os.path.dirname(paths["diagnostic_json"])
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    stages = COMBINED_STAGES if combined else STAGES
+
+    if not (trace_path or chrome_trace_path):
+        return run_dag(stages, paths, max_workers, use_cache)
+
+    tracing.enable()
+
+    try:
+        with tracing.span("pipeline", "pipeline", combined=combined):
+            return run_dag(stages, paths, max_workers, use_cache)
+    finally:
+        # Written on failure too: that is when the trace is most useful.
+        if trace_path:
+            tracing.write_jsonl(trace_path)
+        if chrome_trace_path:
+            tracing.write_chrome(chrome_trace_path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the DDR pipeline.")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore the stage cache and rebuild every artifact.",
+    )
+    parser.add_argument(
+        "--combined",
+        action="store_true",
+        help="Extract areas and systems with a single LLM call.",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="JSONL",
+        help="Write per-stage, OCR page and LLM call timings as JSON lines.",
+    )
+    parser.add_argument(
+        "--chrome-trace",
+        metavar="JSON",
+        help="Also write the trace in Chrome trace-event format (chrome://tracing, Perfetto).",
+    )
+    parser.add_argument(
+        "--building-id",
+        help="Name stored in DIAGNOSTIC_STORE (default: the inspection PDF's file name).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=MAX_WORKERS,
+        help=f"Stages allowed to run concurrently (default {MAX_WORKERS}).",
+    )
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
+
     print("\n========== STARTING DDR PIPELINE ==========\n")
 
-    # 1. Inspection OCR
-    run([
-        os.path.join(SCRIPTS_DIR, "extract_text.py"),
-        INSPECTION_PDF,
-        INSPECTION_TXT
-    ])
-
-    # 2. Thermal OCR
-    run([
-        os.path.join(SCRIPTS_DIR, "extract_text_ocr.py"),
-        THERMAL_PDF,
-        THERMAL_TXT
-    ])
-
-    # 3. Area Extraction
-    run([
-        os.path.join(SCRIPTS_DIR, "extract_areas.py"),
-        INSPECTION_TXT,
-        AREAS_JSON
-    ])
-
-    # 4. System Extraction
-    run([
-        os.path.join(SCRIPTS_DIR, "extract_systems.py"),
-        INSPECTION_TXT,
-        SYSTEMS_JSON
-    ])
-
-    # 5. Thermal Extraction
-    run([
-        os.path.join(SCRIPTS_DIR, "extract_thermal.py"),
-        THERMAL_TXT,
-        THERMAL_JSON
-    ])
-
-    # 6. Merge + Validate
-    run([
-        os.path.join(SCRIPTS_DIR, "merge.py"),
-        AREAS_JSON,
-        SYSTEMS_JSON,
-        THERMAL_JSON,
-        DIAGNOSTIC_JSON
-    ])
+    building_id = args.building_id or os.path.splitext(os.path.basename(INSPECTION_PDF))[0]
+    paths = build_paths(INSPECTION_PDF, THERMAL_PDF, DATA_DIR, building_id)
+
+    try:
+        run_pipeline(
+            paths,
+            args.workers,
+            use_cache=not args.force,
+            combined=args.combined,
+            trace_path=args.trace,
+            chrome_trace_path=args.chrome_trace,
+        )
+    except PipelineError as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        llm_cache.print_stats()
+        ocr_cache.print_stats()
 
     print("\n========== PIPELINE COMPLETE ==========\n")
     print(f"Final output → {DIAGNOSTIC_JSON}")
@@ -0,0 +1,363 @@
+"""
+Long-lived pipeline service. The EasyOCR Reader, torch and the OpenAI
+client are loaded once at startup, so each job only pays for its own work.
+
+    python run_server.py --out-dir out/ [--port 8750] [--queue-size 8] [--workers 1]
+
+With --workers 1 jobs run in this process. With more, each job runs in one
+of that many worker processes (each warmed up once), so jobs never share a
+trace or console output.
+
+API (local HTTP, JSON):
+
+    POST /jobs           {"inspection_pdf": ..., "thermal_pdf": ..., "building_id": optional,
+                          "combined": false, "force": false}
+                         → 202 {"job_id", "status": "queued"}
+                         → 429 with Retry-After when the queue is full
+    POST /jobs?wait=1    same, but answers when the job has finished, with the diagnostic
+    GET  /jobs/<job_id>  → status, output directory, timings, error
+    GET  /health         → queue depth and job counts
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import run_batch
+import run_pipeline
+
+# scripts/ is on sys.path once run_pipeline is imported.
+import extract_text_ocr
+import llm_cache
+import llm_client
+import merge
+import ocr_cache
+import rules
+
+
+DEFAULT_PORT = 8750
+QUEUE_SIZE = 8
+WORKERS = 1
+
+# Finished jobs kept for GET /jobs/<id>; older ones are forgotten.
+JOB_HISTORY = 1000
+
+
+class BusyError(RuntimeError):
+    pass
+
+
+class JobService:
+    """
+    Bounded job queue drained by worker threads. Each thread runs its job's
+    pipeline in this process (--workers 1) or hands it to a spawned worker
+    process.
+    """
+
+    def __init__(self, out_root, queue_size=QUEUE_SIZE, workers=WORKERS, warm=True):
+        self.out_root = out_root
+        self.pool = None
+
+        if workers > 1:
+            # spawn, not fork: this process already runs the HTTP and LLM
+            # client threads, which a forked child would inherit half-dead.
+            ctx = multiprocessing.get_context("spawn")
+            self.pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=ctx,
+                initializer=init_job_process,
+                initargs=(ctx.BoundedSemaphore(1), warm),
+            )
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.workers = [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+
+    def start(self):
+        for w in self.workers:
+            w.start()
+
+    def submit(self, request: dict):
+        """Queue a job; returns None when the queue is full."""
+        if not isinstance(request, dict):
+            raise ValueError("[ERROR] Job must be a JSON object.")
+
+        for key in ("inspection_pdf", "thermal_pdf"):
+            path = request.get(key)
+            if not path or not os.path.exists(path):
+                raise FileNotFoundError(f"[ERROR] {key} not found: {path}")
+
+        job_id = uuid.uuid4().hex[:12]
+        building_id = str(request.get("building_id") or job_id)
+        out_dir = self.building_dir(building_id)
+
+        job = {
+            "job_id": job_id,
+            "building_id": building_id,
+            "inspection_pdf": request["inspection_pdf"],
+            "thermal_pdf": request["thermal_pdf"],
+            "combined": bool(request.get("combined")),
+            "use_cache": not request.get("force"),
+            "out_dir": out_dir,
+            "status": "queued",
+            "submitted": time.time(),
+            "seconds": None,
+            "error": None,
+            "done": threading.Event(),
+        }
+
+        with self.lock:
+            # Two runs writing one building's directory would race on its
+            # stage cache and artifacts.
+            for other in self.jobs.values():
+                if other["out_dir"] == job["out_dir"] and other["status"] in {"queued", "running"}:
+                    raise BusyError(f"[ERROR] Building {building_id} already has job {other['job_id']}")
+
+            try:
+                self.queue.put_nowait(job)
+            except queue.Full:
+                return None
+
+            self.jobs[job_id] = job
+            while len(self.jobs) > JOB_HISTORY:
+                self.jobs.popitem(last=False)
+
+        print(f"[JOB] {job_id} queued ({building_id}), {self.queue.qsize()} waiting")
+        return job
+
+    def building_dir(self, building_id: str) -> str:
+        """out_root/building_id, refusing IDs that would escape out_root."""
+        if (
+            building_id in {"", ".", ".."}
+            or os.path.isabs(building_id)
+            or os.path.basename(building_id) != building_id
+            or "\\" in building_id
+        ):
+            raise ValueError(f"[ERROR] building_id must be a plain directory name: {building_id!r}")
+
+        root = os.path.realpath(self.out_root)
+        out_dir = os.path.realpath(os.path.join(root, building_id))
+
+        if os.path.dirname(out_dir) != root:
+            raise ValueError(f"[ERROR] building_id resolves outside the output directory: {building_id!r}")
+
+        return out_dir
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            job["status"] = "running"
+            started = time.perf_counter()
+
+            try:
+                if self.pool is None:
+                    paths = run_pipeline.build_paths(
+                        job["inspection_pdf"], job["thermal_pdf"], job["out_dir"], job["building_id"]
+                    )
+                    run_pipeline.run_pipeline(paths, use_cache=job["use_cache"], combined=job["combined"])
+                    job["status"] = "done"
+                else:
+                    result = self.pool.submit(
+                        run_batch.process_building,
+                        {k: job[k] for k in ("building_id", "inspection_pdf", "thermal_pdf")},
+                        os.path.dirname(job["out_dir"]),
+                        job["use_cache"],
+                        job["combined"],
+                    ).result()
+                    job["status"] = result["status"]
+                    job["error"] = result["error"]
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+            finally:
+                job["seconds"] = round(time.perf_counter() - started, 2)
+                job["done"].set()
+                self.queue.task_done()
+
+            print(f"[JOB] {job['job_id']} {job['status']} in {job['seconds']}s")
+
+    def health(self):
+        with self.lock:
+            statuses = [j["status"] for j in self.jobs.values()]
+
+        return {
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "workers": len(self.workers),
+            **{s: statuses.count(s) for s in ("running", "done", "failed")},
+        }
+
+
+def public(job):
+    return {k: v for k, v in job.items() if k != "done"}
+
+
+def warm_up():
+    """Load the models and clients every job would otherwise load itself."""
+    started = time.perf_counter()
+
+    try:
+        extract_text_ocr.get_reader()
+        print("[INFO] EasyOCR reader loaded")
+    except Exception as e:
+        print(f"[WARNING] EasyOCR reader not preloaded: {e}")
+
+    try:
+        llm_client.get_client().ensure_ready()
+        print("[INFO] LLM client ready")
+    except Exception as e:
+        print(f"[WARNING] LLM client not preloaded: {e}")
+
+    rules.default_plan()
+    llm_cache.get_cache()
+
+    print(f"[INFO] Warm-up took {time.perf_counter() - started:.1f}s")
+
+
+def init_job_process(ocr_limit, warm):
+    # Worker processes share one OCR slot, as the in-process pipeline does.
+    run_pipeline.LIMITS["ocr"] = ocr_limit
+
+    if warm:
+        warm_up()
+
+
+class JobHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service = None
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        path = urlparse(self.path).path.rstrip("/")
+
+        if path == "/health":
+            self._send(200, self.service.health())
+            return
+
+        if path.startswith("/jobs/"):
+            job = self.service.get(path.rsplit("/", 1)[1])
+            if job is None:
+                self._send(404, {"error": "Unknown job"})
+            else:
+                self._send(200, public(job))
+            return
+
+        self._send(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+
+        if url.path.rstrip("/") != "/jobs":
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            job = self.service.submit(request)
+        except (ValueError, FileNotFoundError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        except BusyError as e:
+            self._send(409, {"error": str(e)})
+            return
+
+        if job is None:
+            # Back-pressure: the client should slow down, not pile up work.
+            self._send(429, {"error": "Job queue is full"}, {"Retry-After": "5"})
+            return
+
+        if parse_qs(url.query).get("wait", ["0"])[0] not in {"1", "true"}:
+            self._send(202, public(job))
+            return
+
+        job["done"].wait()
+        body = public(job)
+
+        if job["status"] == "done":
+            body["diagnostic"] = merge.load_json(
+                os.path.join(job["out_dir"], "diagnostic.json")
+            )
+
+        self._send(200 if job["status"] == "done" else 500, body)
+
+
+def start_server(out_root, port=DEFAULT_PORT, queue_size=QUEUE_SIZE, workers=WORKERS, host="127.0.0.1",
+                 warm=True):
+    service = JobService(out_root, queue_size, workers, warm)
+    service.start()
+
+    handler = type("Handler", (JobHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="http", daemon=True).start()
+
+    return server, service
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve the DDR pipeline with warm models.")
+    parser.add_argument("--out-dir", required=True, help="Root directory for per-job outputs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE,
+                        help=f"Jobs waiting before new ones get 429 (default {QUEUE_SIZE}).")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help=f"Jobs run at once (default {WORKERS}); above 1, each in its own worker process.")
+    parser.add_argument("--no-warm-up", action="store_true", help="Skip preloading EasyOCR and the LLM client.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    # With worker processes, each of them warms up instead.
+    if not args.no_warm_up and args.workers <= 1:
+        warm_up()
+
+    server, _ = start_server(
+        args.out_dir, args.port, args.queue_size, args.workers, args.host, warm=not args.no_warm_up
+    )
+    print(f"[INFO] Listening on http://{args.host}:{server.server_address[1]}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        llm_cache.print_stats()
+        ocr_cache.print_stats()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import llm_client
+from tokens import count_tokens
+
+
+# Inspection texts above this many tokens are split into page windows of
+# at most this size and extracted window by window. 0 disables chunking.
+CHUNK_TOKENS = int(os.getenv("EXTRACTION_CHUNK_TOKENS", "6000"))
+
+PAGE_MARKER = re.compile(r"^--- (?:OCR )?PAGE \d+ ---$", re.MULTILINE)
+
+
+def split_page_blocks(text: str) -> list:
+    """Split text into blocks that each start with their page marker."""
+    starts = [m.start() for m in PAGE_MARKER.finditer(text)]
+
+    if not starts:
+        return [text]
+
+    blocks = [text[:starts[0]]] if text[:starts[0]].strip() else []
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        blocks.append(text[start:end])
+
+    return blocks
+
+
+def _split_oversized(block: str, max_tokens: int) -> list:
+    parts, current, size = [], [], 0
+
+    for line in block.splitlines(keepends=True):
+        n = count_tokens(line)
+        if current and size + n > max_tokens:
+            parts.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += n
+
+    if current:
+        parts.append("".join(current))
+
+    return parts
+
+
+def chunk_pages(text: str, max_tokens: int = CHUNK_TOKENS) -> list:
+    """Greedily pack whole pages into windows of at most max_tokens."""
+    windows, current, size = [], [], 0
+
+    for block in split_page_blocks(text):
+        n = count_tokens(block)
+
+        # A single page larger than the window is split on line boundaries.
+        pieces = _split_oversized(block, max_tokens) if n > max_tokens else [block]
+
+        for piece in pieces:
+            n = count_tokens(piece)
+            if current and size + n > max_tokens:
+                windows.append("".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += n
+
+    if current:
+        windows.append("".join(current))
+
+    return windows
+
+
+def needs_chunking(text: str, max_tokens: int = CHUNK_TOKENS) -> bool:
+    return max_tokens > 0 and count_tokens(text) > max_tokens
+
+
+def map_windows(fn, windows: list) -> list:
+    """Run fn over every window concurrently, keeping window order."""
+    workers = max(1, min(len(windows), llm_client.MAX_CONCURRENCY))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, windows))
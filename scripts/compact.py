@@ -0,0 +1,160 @@
+import re
+
+import chunking
+import tracing
+from tokens import count_tokens
+
+
+# Lines present on at least this share of pages are lifted into one header.
+# Needs a few pages before "repeated" means anything.
+COMMON_LINE_SHARE = 0.8
+COMMON_MIN_PAGES = 3
+
+# Per-page readings must never be lifted, even if two pages happen to agree.
+READING_LINE = re.compile(r"hotspot|coldspot|thermal image", re.IGNORECASE)
+
+PHOTO_LINE = re.compile(r"^(?:Photo \d+\s*)+$")
+PHOTO_LABEL = re.compile(r"^(?:Positive|Negative) side photographs$", re.IGNORECASE)
+TEMPERATURE_LINE = re.compile(r"^-?\d+(?:[.,]\d+)?\s*°?\s*C$")
+PAGE_NUMBER_LINE = re.compile(r"^\d{1,4}$")
+NUMBER = re.compile(r"-?\d+(?:[.,]\d+)?")
+
+MARKER = chunking.PAGE_MARKER
+
+
+def _lines(block: str) -> list:
+    lines = []
+
+    for raw in block.splitlines():
+        line = re.sub(r"\s+", " ", raw).strip()
+        if not line:
+            continue
+
+        # "Emissivity : " followed by "0.94" on the next line → one line.
+        # An empty form field ("Mobile:" then "Email:") is left alone.
+        if lines and lines[-1].endswith(":") and ":" not in line and not MARKER.match(line):
+            lines[-1] = f"{lines[-1]} {line}"
+        else:
+            lines.append(line)
+
+    return lines
+
+
+def _split(text: str) -> list:
+    """Return [(marker or None, [lines])] for each page block."""
+    pages = []
+
+    for block in chunking.split_page_blocks(text):
+        lines = _lines(block)
+        if lines and MARKER.match(lines[0]):
+            pages.append((lines[0], lines[1:]))
+        else:
+            pages.append((None, lines))
+
+    return pages
+
+
+def _common_lines(pages: list) -> list:
+    if len(pages) < COMMON_MIN_PAGES:
+        return []
+
+    counts = {}
+    order = []
+    for _, lines in pages:
+        for line in dict.fromkeys(lines):
+            if line not in counts:
+                order.append(line)
+            counts[line] = counts.get(line, 0) + 1
+
+    needed = COMMON_LINE_SHARE * len(pages)
+    return [
+        line for line in order
+        if counts[line] >= needed and not READING_LINE.search(line)
+    ]
+
+
+def _join(header: list, pages: list) -> str:
+    parts = []
+
+    if header:
+        parts.append("--- COMMON TO ALL PAGES ---\n" + "\n".join(header))
+
+    for marker, lines in pages:
+        if not lines:
+            continue
+        body = "\n".join(lines)
+        parts.append(f"{marker}\n{body}" if marker else body)
+
+    return "\n\n".join(parts) + "\n"
+
+
+def compact_thermal_text(text: str) -> str:
+    """
+    Collapse per-page camera boilerplate (emissivity, reflected temperature,
+    device, serial, date) into one header, drop the overlay temperatures that
+    duplicate the Hotspot/Coldspot values and the bare page-number footer.
+    """
+    pages = _split(text)
+    header = _common_lines(pages)
+    common = set(header)
+
+    compacted = []
+    for marker, lines in pages:
+        readings = {
+            float(v.replace(",", "."))
+            for l in lines if READING_LINE.search(l)
+            for v in NUMBER.findall(l)
+        }
+
+        kept = []
+        for line in lines:
+            if line in common:
+                continue
+            if TEMPERATURE_LINE.match(line) and float(NUMBER.findall(line)[0].replace(",", ".")) in readings:
+                continue
+            if PAGE_NUMBER_LINE.match(line):
+                continue
+            kept.append(line)
+
+        compacted.append((marker, kept))
+
+    return _join(header, compacted)
+
+
+def compact_inspection_text(text: str) -> str:
+    """
+    Normalise whitespace, drop photo placeholders ("Photo 12 Photo 13") and
+    their labels, consecutive duplicate lines and repeated page furniture.
+    """
+    pages = _split(text)
+    header = _common_lines(pages)
+    common = set(header)
+
+    compacted = []
+    for marker, lines in pages:
+        kept = []
+        for line in lines:
+            if line in common or PHOTO_LINE.match(line) or PHOTO_LABEL.match(line):
+                continue
+            if kept and kept[-1] == line:
+                continue
+            kept.append(line)
+
+        compacted.append((marker, kept))
+
+    return _join(header, compacted)
+
+
+def compact_for_llm(stage: str, text: str, kind: str) -> str:
+    """Compact `text` for `stage`; its token counts go to the log and the trace."""
+    compactor = compact_thermal_text if kind == "thermal" else compact_inspection_text
+    compacted = compactor(text)
+
+    before = count_tokens(text)
+    after = count_tokens(compacted)
+    tracing.event("compact", "tokens", stage=stage, before=before, after=after)
+
+    saved = 100 * (before - after) / before if before else 0.0
+    print(f"[TOKENS] {stage}: {before} → {after} input tokens ({saved:.0f}% saved)")
+
+    return compacted
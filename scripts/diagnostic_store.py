@@ -0,0 +1,400 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+
+import rules
+
+
+# Unset: merge writes diagnostic.json only. Set: every merge also upserts
+# the building into this SQLite file.
+STORE_PATH = os.getenv("DIAGNOSTIC_STORE") or None
+
+# Output directories shared by single pipeline runs: their name says
+# nothing about the building, so those runs need an explicit ID.
+SHARED_OUTPUT_DIRS = {"data"}
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buildings (
+    building_id TEXT PRIMARY KEY,
+    severity TEXT NOT NULL,
+    area_count INTEGER NOT NULL,
+    missing_count INTEGER NOT NULL,
+    max_temperature_difference REAL,
+    source_path TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS areas (
+    building_id TEXT NOT NULL,
+    area_name TEXT NOT NULL,
+    negative_observation TEXT,
+    positive_source TEXT,
+    thermal_confirmation TEXT,
+    confidence TEXT,
+    max_temperature_difference REAL,
+    thermal_images TEXT
+);
+CREATE TABLE IF NOT EXISTS system_flags (
+    building_id TEXT NOT NULL,
+    section TEXT NOT NULL,
+    flag TEXT NOT NULL,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS root_causes (
+    building_id TEXT NOT NULL,
+    root_cause TEXT NOT NULL,
+    rank INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS thermal_readings (
+    building_id TEXT NOT NULL,
+    image_name TEXT NOT NULL,
+    area_name TEXT,
+    hotspot_temp REAL,
+    coldspot_temp REAL,
+    temperature_difference REAL,
+    moisture_indicator TEXT,
+    confidence TEXT
+);
+CREATE TABLE IF NOT EXISTS missing_information (
+    building_id TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    field TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_buildings_severity ON buildings(severity);
+CREATE INDEX IF NOT EXISTS idx_buildings_source ON buildings(source_path);
+CREATE INDEX IF NOT EXISTS idx_root_causes_cause ON root_causes(root_cause, building_id);
+CREATE INDEX IF NOT EXISTS idx_areas_name ON areas(area_name COLLATE NOCASE, building_id);
+CREATE INDEX IF NOT EXISTS idx_areas_building ON areas(building_id);
+CREATE INDEX IF NOT EXISTS idx_flags_lookup ON system_flags(section, flag, value, building_id);
+CREATE INDEX IF NOT EXISTS idx_flags_building ON system_flags(building_id);
+CREATE INDEX IF NOT EXISTS idx_root_causes_building ON root_causes(building_id);
+CREATE INDEX IF NOT EXISTS idx_thermal_building ON thermal_readings(building_id);
+CREATE INDEX IF NOT EXISTS idx_thermal_delta ON thermal_readings(temperature_difference);
+CREATE INDEX IF NOT EXISTS idx_missing_building ON missing_information(building_id);
+CREATE INDEX IF NOT EXISTS idx_missing_field ON missing_information(field, subject);
+"""
+
+CHILD_TABLES = ("areas", "system_flags", "root_causes", "thermal_readings", "missing_information")
+
+
+_lock = threading.Lock()
+
+
+def connect(path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL keeps NORMAL crash-safe; only the last commits can be lost.
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def building_id_for(diagnostic_path: str, conn=None) -> str:
+    """
+    The ID a diagnostic.json was stored under before, else its output
+    directory name (out/<building_id>/). Shared output directories have no
+    usable name and raise ValueError.
+    """
+    source = os.path.abspath(diagnostic_path)
+
+    if conn is not None:
+        row = conn.execute(
+            "SELECT building_id FROM buildings WHERE source_path = ?", (source,)
+        ).fetchone()
+        if row:
+            return row[0]
+
+    name = os.path.basename(os.path.dirname(source))
+    if name in SHARED_OUTPUT_DIRS:
+        raise ValueError(f"[ERROR] No building ID for {diagnostic_path}; pass one explicitly.")
+
+    return name
+
+
+def thermal_beside(diagnostic_path: str):
+    """thermal.json from the same output directory, if there is one."""
+    path = os.path.join(os.path.dirname(diagnostic_path), "thermal.json")
+
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def _rows(building_id, diagnostic, thermal):
+    areas = diagnostic["areas"]
+
+    # thermal.json has the readings; the diagnostic only the image names per area.
+    area_of = {}
+    for a in areas:
+        for name in a.get("thermal_images", []):
+            area_of.setdefault(name, a["area_name"])
+
+    rows = {
+        "areas": [
+            (building_id, a["area_name"], a.get("negative_observation"), a.get("positive_source"),
+             a.get("thermal_confirmation"), a.get("confidence"),
+             _number(a.get("max_temperature_difference")),
+             json.dumps(a.get("thermal_images", [])))
+            for a in areas
+        ],
+        "system_flags": [
+            (building_id, section, flag, value if isinstance(value, str) else json.dumps(value))
+            for section in rules.SYSTEM_SECTIONS
+            for flag, value in diagnostic.get(section, {}).items()
+        ],
+        "root_causes": [
+            (building_id, cause, rank)
+            for rank, cause in enumerate(diagnostic["overall"]["primary_root_causes"])
+        ],
+        "thermal_readings": [
+            (building_id, t["image_name"], area_of.get(t["image_name"]),
+             _number(t.get("hotspot_temp")), _number(t.get("coldspot_temp")),
+             _number(t.get("temperature_difference")), t.get("moisture_indicator"), t.get("confidence"))
+            for t in (thermal or {}).get("thermal_readings", [])
+        ],
+        "missing_information": [
+            (building_id, *entry.rsplit(":", 1))
+            for entry in diagnostic["overall"]["missing_information"]
+            if ":" in entry
+        ],
+    }
+
+    deltas = [r[6] for r in rows["areas"] if r[6] is not None]
+    deltas += [r[5] for r in rows["thermal_readings"] if r[5] is not None]
+
+    building = (
+        building_id,
+        diagnostic["overall"]["severity"],
+        len(areas),
+        len(diagnostic["overall"]["missing_information"]),
+        max(deltas) if deltas else None,
+    )
+
+    return building, rows
+
+
+def upsert(conn, building_id: str, diagnostic: dict, thermal: dict = None, source_path: str = None):
+    """Replace everything stored for one building in a single transaction."""
+    building, rows = _rows(building_id, diagnostic, thermal)
+
+    with _lock, conn:
+        for table in CHILD_TABLES:
+            conn.execute(f"DELETE FROM {table} WHERE building_id = ?", (building_id,))
+
+        conn.execute(
+            "INSERT OR REPLACE INTO buildings (building_id, severity, area_count, missing_count, "
+            "max_temperature_difference, source_path, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (*building, source_path, time.time()),
+        )
+
+        for table, values in rows.items():
+            if values:
+                marks = ", ".join("?" * len(values[0]))
+                conn.executemany(f"INSERT INTO {table} VALUES ({marks})", values)
+
+
+def store(diagnostic: dict, diagnostic_path: str, thermal: dict = None, building_id: str = None,
+          path: str = None):
+    """Upsert one merged building when a store is configured."""
+    path = path or STORE_PATH
+    if not path:
+        return
+
+    conn = connect(path)
+    try:
+        try:
+            building_id = building_id or building_id_for(diagnostic_path, conn)
+        except ValueError:
+            print(f"[WARNING] {diagnostic_path} not stored in {path}: no building ID (pass one explicitly)")
+            return
+
+        upsert(conn, building_id, diagnostic, thermal, os.path.abspath(diagnostic_path))
+    finally:
+        conn.close()
+
+    print(f"[SUCCESS] Building {building_id} stored → {path}")
+
+
+def store_files(paths: list, path: str = None):
+    """Re-read rewritten diagnostic.json files into the store, if configured."""
+    path = path or STORE_PATH
+    if not path or not paths:
+        return
+
+    conn = connect(path)
+    try:
+        count = ingest(conn, paths)
+    finally:
+        conn.close()
+
+    print(f"[SUCCESS] {count} building(s) updated → {path}")
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+
+def find_buildings(conn, severity=None, root_causes=(), areas=(), flags=()) -> list:
+    """
+    Buildings matching every filter. flags are (section, flag, value)
+    triples; area names match case-insensitively.
+    """
+    sql = ["SELECT b.building_id, b.severity, b.area_count, b.max_temperature_difference FROM buildings b"]
+    where, params = [], []
+
+    if severity:
+        where.append("b.severity = ?")
+        params.append(severity)
+
+    for cause in root_causes:
+        where.append("EXISTS (SELECT 1 FROM root_causes r WHERE r.building_id = b.building_id "
+                     "AND r.root_cause = ?)")
+        params.append(cause)
+
+    for area in areas:
+        where.append("EXISTS (SELECT 1 FROM areas a WHERE a.building_id = b.building_id "
+                     "AND a.area_name = ? COLLATE NOCASE)")
+        params.append(area)
+
+    for section, flag, value in flags:
+        where.append("EXISTS (SELECT 1 FROM system_flags f WHERE f.building_id = b.building_id "
+                     "AND f.section = ? AND f.flag = ? AND f.value = ?)")
+        params += [section, flag, value]
+
+    if where:
+        sql.append("WHERE " + " AND ".join(where))
+    sql.append("ORDER BY b.building_id")
+
+    return conn.execute(" ".join(sql), params).fetchall()
+
+
+def summary(conn) -> dict:
+    return {
+        "buildings": conn.execute("SELECT COUNT(*) FROM buildings").fetchone()[0],
+        "severity": dict(conn.execute(
+            "SELECT severity, COUNT(*) FROM buildings GROUP BY severity ORDER BY COUNT(*) DESC"
+        )),
+        "root_causes": dict(conn.execute(
+            "SELECT root_cause, COUNT(*) FROM root_causes GROUP BY root_cause ORDER BY COUNT(*) DESC"
+        )),
+        "missing_fields": dict(conn.execute(
+            "SELECT field, COUNT(*) FROM missing_information GROUP BY field ORDER BY COUNT(*) DESC LIMIT 10"
+        )),
+    }
+
+
+def ingest(conn, targets: list) -> int:
+    """Load existing diagnostic.json files (and thermal.json beside them)."""
+    count = 0
+
+    for path in rules.find_diagnostics(targets):
+        try:
+            building_id = building_id_for(path, conn)
+        except ValueError:
+            print(f"[WARNING] Skipped {path}: no building ID (store it through merge with one)")
+            continue
+
+        with open(path, "r", encoding="utf-8") as f:
+            diagnostic = json.load(f)
+
+        upsert(conn, building_id, diagnostic, thermal_beside(path), os.path.abspath(path))
+        count += 1
+
+    return count
+
+
+def parse_flag(text: str):
+    try:
+        field, value = text.split("=", 1)
+        section, flag = field.split(".", 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected <section>.<flag>=<value>, got {text!r}")
+
+    return section, flag, value
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Query the portfolio diagnostic store.")
+    parser.add_argument("--db", default=STORE_PATH, required=STORE_PATH is None,
+                        help="SQLite store (default: $DIAGNOSTIC_STORE).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load = commands.add_parser("ingest", help="Load diagnostic.json files or output directories.")
+    load.add_argument("targets", nargs="+")
+
+    find = commands.add_parser("buildings", help="List buildings matching all filters.")
+    find.add_argument("--severity", choices=rules.SEVERITY_LEVELS)
+    find.add_argument("--root-cause", action="append", default=[])
+    find.add_argument("--area", action="append", default=[])
+    find.add_argument("--flag", action="append", default=[], type=parse_flag,
+                      help="e.g. terrace.surface_cracks=Yes")
+    find.add_argument("--json", action="store_true")
+
+    commands.add_parser("summary", help="Counts by severity, root cause and missing field.")
+
+    sql = commands.add_parser("sql", help="Run a read-only SQL query.")
+    sql.add_argument("query")
+
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+
+    conn = connect(args.db)
+    started = time.perf_counter()
+
+    if args.command == "ingest":
+        count = ingest(conn, args.targets)
+        print(f"[SUCCESS] {count} building(s) stored → {args.db} ({time.perf_counter() - started:.2f}s)")
+
+    elif args.command == "buildings":
+        rows = find_buildings(conn, args.severity, args.root_cause, args.area, args.flag)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if args.json:
+            print(json.dumps([
+                {"building_id": b, "severity": s, "areas": n, "max_temperature_difference": d}
+                for b, s, n, d in rows
+            ], indent=2))
+        else:
+            for building_id, severity, area_count, delta in rows:
+                print(f"{building_id}\t{severity}\t{area_count} areas\tmax ΔT {delta if delta is not None else '-'}")
+            print(f"[INFO] {len(rows)} building(s) in {elapsed_ms:.1f} ms")
+
+    elif args.command == "summary":
+        print(json.dumps(summary(conn), indent=2))
+
+    elif args.command == "sql":
+        conn.close()
+        # A second, read-only handle so ad-hoc queries cannot change the store.
+        conn = sqlite3.connect(f"file:{os.path.abspath(args.db)}?mode=ro", uri=True)
+        try:
+            cursor = conn.execute(args.query)
+        except sqlite3.Error as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+
+        print("\t".join(c[0] for c in cursor.description or []))
+        for row in cursor:
+            print("\t".join("" if v is None else str(v) for v in row))
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
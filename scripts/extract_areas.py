@@ -1,20 +1,16 @@
 import os
+import re
 import json
 import sys
 from typing import Any
-from dotenv import load_dotenv
-from openai import OpenAI
 
+import chunking
+import compact
+import llm_cache
+import repair
 
-MODEL_NAME = "gpt-4o-mini"  
-
-def load_api():
-    load_dotenv()
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("[ERROR] OPENAI_API_KEY not found in environment.")
-    return OpenAI(api_key=api_key)
 
+MODEL_NAME = "gpt-4o-mini"  
 
 def read_text_file(path: str) -> str:
     if not os.path.exists(path):
@@ -62,6 +58,45 @@ Inspection Text:
 {inspection_text}
 """
 
+REQUIRED_KEYS = {
+    "area_name",
+    "negative_observation",
+    "positive_source",
+    "thermal_confirmation",
+    "confidence"
+}
+
+ITEM_SCHEMA = """{
+  "area_name": "string",
+  "negative_observation": "string",
+  "positive_source": "string",
+  "thermal_confirmation": "Not Available",
+  "confidence": "High | Medium | Low"
+}"""
+
+
+def area_problems(area: Any) -> list:
+    if not isinstance(area, dict):
+        return ["is not an object."]
+
+    problems = []
+
+    missing = REQUIRED_KEYS - area.keys()
+    extra = area.keys() - REQUIRED_KEYS
+
+    if missing:
+        problems.append(f"missing keys: {missing}")
+
+    if extra:
+        problems.append(f"has unexpected keys: {extra}")
+
+    for field in ("area_name", "negative_observation"):
+        if field in area and not (isinstance(area[field], str) and area[field].strip()):
+            problems.append(f"has empty {field}.")
+
+    return problems
+
+
 def validate_structure(data: Any):
     if "areas" not in data:
         raise ValueError("[ERROR] Missing 'areas' key in response.")
@@ -69,59 +104,127 @@ def validate_structure(data: Any):
     if not isinstance(data["areas"], list):
         raise ValueError("[ERROR] 'areas' must be a list.")
 
-    required_keys = {
-        "area_name",
-        "negative_observation",
-        "positive_source",
-        "thermal_confirmation",
-        "confidence"
+    for idx, area in enumerate(data["areas"]):
+        problems = area_problems(area)
+
+        if problems:
+            raise ValueError(f"[ERROR] Area index {idx} {problems[0]}")
+
+
+def fix_area(area: Any) -> Any:
+    """Local fixes: trim strings, drop stray keys, default the optional fields."""
+    if not isinstance(area, dict):
+        return area
+
+    fixed = {
+        k: v.strip() if isinstance(v, str) else v
+        for k, v in area.items()
+        if k in REQUIRED_KEYS
     }
 
-    for idx, area in enumerate(data["areas"]):
-        if not isinstance(area, dict):
-            raise ValueError(f"[ERROR] Area index {idx} is not an object.")
+    for field in ("positive_source", "thermal_confirmation"):
+        if not fixed.get(field):
+            fixed[field] = "Not Available"
+
+    if not isinstance(fixed.get("confidence"), str) or fixed["confidence"] not in CONFIDENCE_RANK:
+        fixed["confidence"] = "Low"
 
-        missing = required_keys - area.keys()
-        extra = area.keys() - required_keys
+    return fixed
 
-        if missing:
-            raise ValueError(f"[ERROR] Area index {idx} missing keys: {missing}")
 
-        if extra:
-            raise ValueError(f"[ERROR] Area index {idx} has unexpected keys: {extra}")
+def parse_response(raw: str) -> dict:
+    parsed = repair.loads(raw)
 
-        if not area["area_name"].strip():
-            raise ValueError(f"[ERROR] Area index {idx} has empty area_name.")
+    if not isinstance(parsed, dict) or not isinstance(parsed.get("areas"), list):
+        raise ValueError("[ERROR] Missing 'areas' list in response.")
 
-        if not area["negative_observation"].strip():
-            raise ValueError(f"[ERROR] Area index {idx} has empty negative_observation.")
+    return parsed
 
 
+def repair_areas(data: dict, inspection_text: str) -> dict:
+    """Keep valid areas, fix or re-ask about the rest."""
+    areas = repair.repair_items(
+        "areas",
+        data["areas"],
+        area_problems,
+        fix=fix_area,
+        ask=lambda failing: repair.reask(MODEL_NAME, ITEM_SCHEMA, inspection_text, failing),
+    )
 
-def extract_areas(inspection_text: str) -> dict:
-    client = load_api()
+    return {"areas": areas}
 
+
+def extract_areas_window(inspection_text: str) -> dict:
     prompt = build_prompt(inspection_text)
 
-    response = client.chat.completions.create(
-        model=MODEL_NAME,
-        temperature=0,
-        messages=[
+    data = llm_cache.complete(
+        MODEL_NAME,
+        [
             {"role": "system", "content": "You output strict JSON only."},
             {"role": "user", "content": prompt}
         ],
+        temperature=0,
+        parse=parse_response,
     )
 
-    raw_output = response.choices[0].message.content.strip()
+    return repair_areas(data, inspection_text)
 
-    try:
-        parsed = json.loads(raw_output)
-    except json.JSONDecodeError:
-        raise ValueError("[ERROR] Model did not return valid JSON.")
 
-    validate_structure(parsed)
+# -----------------------------
+# Chunked map-reduce
+# -----------------------------
 
-    return parsed
+CONFIDENCE_RANK = {"Low": 1, "Medium": 2, "High": 3}
+
+
+def normalise_area_name(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", name.lower()).strip()
+
+
+def merge_areas(results: list) -> dict:
+    """Combine per-window results, de-duplicating areas by normalised name."""
+    merged = {}
+
+    for result in results:
+        for area in result["areas"]:
+            key = normalise_area_name(area["area_name"])
+
+            if key not in merged:
+                merged[key] = dict(area)
+                continue
+
+            kept = merged[key]
+
+            for field in ("negative_observation", "positive_source"):
+                value = area[field]
+
+                if value == "Not Available" or value.lower() in kept[field].lower():
+                    continue
+
+                if kept[field] == "Not Available":
+                    kept[field] = value
+                else:
+                    kept[field] = f"{kept[field]}; {value}"
+
+            if CONFIDENCE_RANK.get(area["confidence"], 0) > CONFIDENCE_RANK.get(kept["confidence"], 0):
+                kept["confidence"] = area["confidence"]
+
+    return {"areas": list(merged.values())}
+
+
+def extract_areas(inspection_text: str) -> dict:
+    inspection_text = compact.compact_for_llm("areas", inspection_text, "inspection")
+
+    if not chunking.needs_chunking(inspection_text):
+        return extract_areas_window(inspection_text)
+
+    windows = chunking.chunk_pages(inspection_text)
+    print(f"[INFO] Inspection text split into {len(windows)} windows")
+
+    merged = merge_areas(chunking.map_windows(extract_areas_window, windows))
+    validate_structure(merged)
+
+    return merged
 
 
 
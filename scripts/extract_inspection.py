@@ -0,0 +1,168 @@
+import os
+import sys
+import json
+from typing import Any
+
+import chunking
+import compact
+import llm_cache
+import repair
+import extract_areas
+import extract_systems
+
+
+MODEL_NAME = "gpt-4o-mini"
+
+
+def read_text(path: str) -> str:
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"[ERROR] File not found: {path}")
+
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    if not text.strip():
+        raise ValueError("[ERROR] Empty inspection text.")
+
+    return text
+
+
+def build_prompt(text: str) -> str:
+    return f"""
+You are a building diagnostics expert with over 15 years of experience in diagnosing houses.
+
+From the inspection text, extract BOTH the impacted areas with their observations
+AND the building-wide system-level issues.
+
+Return STRICT JSON only in this exact format:
+
+{{
+  "areas": [
+    {{
+      "area_name": "string",
+      "negative_observation": "string",
+      "positive_source": "string",
+      "thermal_confirmation": "Not Available",
+      "confidence": "High | Medium | Low"
+    }}
+  ],
+  "bathroom_issues": {{
+    "tile_joint_gaps": "Yes | No | Not Available",
+    "nahani_trap_damage": "Yes | No | Not Available",
+    "concealed_plumbing": "Yes | No | Not Available"
+  }},
+  "external_wall": {{
+    "cracks_present": "Yes | No | Not Available",
+    "vegetation": "Yes | No | Not Available",
+    "internal_dampness": "Yes | No | Not Available"
+  }},
+  "terrace": {{
+    "surface_cracks": "Yes | No | Not Available",
+    "hollow_sound": "Yes | No | Not Available",
+    "slope_disturbance": "Yes | No | Not Available"
+  }},
+  "parking": {{
+    "ceiling_leakage": "Yes | No | Not Available"
+  }}
+}}
+
+Rules:
+- Only use information from provided text.
+- Do NOT refer any other sources, infer or create new data.
+- If positive source not clearly stated, use "Not Available".
+- Missing system information → "Not Available".
+- Do NOT include comments.
+- Return valid JSON only.
+
+Inspection Text:
+-----------------
+{text}
+"""
+
+
+def split_result(data: Any):
+    if not isinstance(data, dict) or not isinstance(data.get("areas"), list):
+        raise ValueError("[ERROR] Combined response is missing the 'areas' list.")
+
+    areas = {"areas": data["areas"]}
+    systems = {section: data.get(section) for section in extract_systems.EXPECTED_SCHEMA}
+
+    return areas, systems
+
+
+def parse_response(raw: str):
+    return split_result(repair.loads(raw))
+
+
+def extract_inspection_window(text: str):
+    prompt = build_prompt(text)
+
+    areas, systems = llm_cache.complete(
+        MODEL_NAME,
+        [
+            {"role": "system", "content": "You output strict JSON only."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0,
+        parse=parse_response,
+    )
+
+    return (
+        extract_areas.repair_areas(areas, text),
+        extract_systems.repair_systems(systems, text),
+    )
+
+
+def extract_inspection(text: str):
+    """One LLM round-trip per window for both areas and systems."""
+    text = compact.compact_for_llm("inspection", text, "inspection")
+
+    if not chunking.needs_chunking(text):
+        return extract_inspection_window(text)
+
+    windows = chunking.chunk_pages(text)
+    print(f"[INFO] Inspection text split into {len(windows)} windows")
+
+    results = chunking.map_windows(extract_inspection_window, windows)
+
+    areas = extract_areas.merge_areas([a for a, _ in results])
+    systems = extract_systems.reduce_systems([s for _, s in results])
+
+    extract_areas.validate_structure(areas)
+    extract_systems.validate(systems)
+
+    return areas, systems
+
+
+def save(areas: dict, systems: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"areas": areas, "systems": systems}, f, indent=2)
+
+    print(f"[SUCCESS] Combined extraction saved → {path}")
+
+
+def main():
+    if len(sys.argv) != 4:
+        print("Usage: python extract_inspection.py <inspection_txt> <areas_json> <systems_json>")
+        sys.exit(1)
+
+    input_path = sys.argv[1]
+    areas_path = sys.argv[2]
+    systems_path = sys.argv[3]
+
+    print("[INFO] Reading inspection text...")
+    text = read_text(input_path)
+
+    print("[INFO] Extracting areas and systems in one call...")
+    areas, systems = extract_inspection(text)
+
+    print(f"[INFO] Extracted {len(areas['areas'])} areas.")
+
+    extract_areas.save_json(areas, areas_path)
+    extract_systems.save(systems, systems_path)
+
+    print("[DONE] Combined inspection extraction complete.\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,15 @@ import os
 import json
 import sys
 from typing import Any
-from dotenv import load_dotenv
-from openai import OpenAI
 
-
-MODEL_NAME = "gpt-4o-mini"
+import chunking
+import compact
+import llm_cache
+import repair
 
 
+MODEL_NAME = "gpt-4o-mini"
 
-def load_api():
-    load_dotenv()
-    key = os.getenv("OPENAI_API_KEY")
-    if not key:
-        raise ValueError("[ERROR] OPENAI_API_KEY is missing.")
-    return OpenAI(api_key=key)
 
 
 def read_text(path: str) -> str:
@@ -83,48 +78,162 @@ EXPECTED_SCHEMA = {
 }
 
 
+def section_problems(section: str, values: Any) -> list:
+    if not isinstance(values, dict):
+        return [f"Missing section: {section}"]
+
+    problems = []
+
+    for field in EXPECTED_SCHEMA[section]:
+        if field not in values:
+            problems.append(f"Missing field {field} in {section}")
+        elif not isinstance(values[field], str) or values[field] not in ALLOWED:
+            problems.append(f"Invalid value '{values[field]}' for {section}.{field}")
+
+    return problems
+
+
 def validate(data: Any):
-    for section, fields in EXPECTED_SCHEMA.items():
-        if section not in data:
-            raise ValueError(f"[ERROR] Missing section: {section}")
+    for section in EXPECTED_SCHEMA:
+        problems = section_problems(section, data.get(section))
+
+        if problems:
+            raise ValueError(f"[ERROR] {problems[0]}")
+
+
+# Spellings the model uses for the three allowed values.
+SYNONYMS = {
+    "yes": "Yes",
+    "y": "Yes",
+    "true": "Yes",
+    "no": "No",
+    "n": "No",
+    "false": "No",
+    "not available": "Not Available",
+    "n/a": "Not Available",
+    "na": "Not Available",
+    "unknown": "Not Available",
+    "not mentioned": "Not Available",
+}
 
-        for field in fields:
-            if field not in data[section]:
-                raise ValueError(f"[ERROR] Missing field {field} in {section}")
+ITEM_SCHEMA = (
+    '{"section": "<section name>", "fields": {"<field>": "Yes | No | Not Available"}}\n'
+    "Sections and their fields:\n"
+    + json.dumps(EXPECTED_SCHEMA, indent=2)
+)
 
-            value = data[section][field]
 
-            if value not in ALLOWED:
-                raise ValueError(
-                    f"[ERROR] Invalid value '{value}' for {section}.{field}"
-                )
+def fix_section(item: dict) -> dict:
+    """Map known spellings onto the allowed values; missing fields → "Not Available"."""
+    values = item["fields"]
+    if not isinstance(values, dict):
+        return item
 
+    fixed = {}
+    for field in EXPECTED_SCHEMA[item["section"]]:
+        value = values.get(field, "Not Available")
+        if isinstance(value, bool):
+            value = "Yes" if value else "No"
+        if isinstance(value, str):
+            value = SYNONYMS.get(value.strip().lower(), value.strip())
+        fixed[field] = value
 
+    return {"section": item["section"], "fields": fixed}
 
-def extract_systems(text: str) -> dict:
-    client = load_api()
 
+def parse_response(raw: str) -> dict:
+    parsed = repair.loads(raw)
+
+    if not isinstance(parsed, dict):
+        raise ValueError("[ERROR] LLM did not return a JSON object.")
+
+    return parsed
+
+
+def repair_systems(data: dict, text: str) -> dict:
+    """
+    Fix or re-ask about invalid sections. Fields that stay invalid fall back
+    to "Not Available", which is what the prompt asks for when unsure.
+    """
+    items = [{"section": s, "fields": data.get(s)} for s in EXPECTED_SCHEMA]
+
+    def check(item):
+        return section_problems(item["section"], item["fields"])
+
+    def ask(failing):
+        replies = repair.reask(MODEL_NAME, ITEM_SCHEMA, text, failing)
+
+        # Each reply stays bound to the section it was asked about.
+        return [
+            {"section": item["section"], "fields": reply.get("fields") if isinstance(reply, dict) else None}
+            for (item, _), reply in zip(failing, replies)
+        ]
+
+    def fallback(item):
+        values = item["fields"] if isinstance(item["fields"], dict) else {}
+        return {
+            "section": item["section"],
+            "fields": {
+                f: values[f] if isinstance(values.get(f), str) and values[f] in ALLOWED else "Not Available"
+                for f in EXPECTED_SCHEMA[item["section"]]
+            }
+        }
+
+    items = repair.repair_items("systems", items, check, fix=fix_section, ask=ask, fallback=fallback)
+
+    return {section: item["fields"] for section, item in zip(EXPECTED_SCHEMA, items)}
+
+
+def extract_systems_window(text: str) -> dict:
     prompt = build_prompt(text)
 
-    response = client.chat.completions.create(
-        model=MODEL_NAME,
-        temperature=0,
-        messages=[
+    data = llm_cache.complete(
+        MODEL_NAME,
+        [
             {"role": "system", "content": "Return strict JSON only."},
             {"role": "user", "content": prompt}
         ],
+        temperature=0,
+        parse=parse_response,
     )
 
-    raw = response.choices[0].message.content.strip()
+    return repair_systems(data, text)
 
-    try:
-        parsed = json.loads(raw)
-    except json.JSONDecodeError:
-        raise ValueError("[ERROR] LLM did not return valid JSON.")
 
-    validate(parsed)
+# -----------------------------
+# Chunked map-reduce
+# -----------------------------
 
-    return parsed
+# A flag seen as "Yes" in any window wins over "No", which wins over a
+# window that simply did not mention it.
+PRECEDENCE = {"Not Available": 0, "No": 1, "Yes": 2}
+
+
+def reduce_systems(results: list) -> dict:
+    reduced = {}
+
+    for section, fields in EXPECTED_SCHEMA.items():
+        reduced[section] = {}
+        for field in fields:
+            values = [r[section][field] for r in results]
+            reduced[section][field] = max(values, key=PRECEDENCE.get, default="Not Available")
+
+    return reduced
+
+
+def extract_systems(text: str) -> dict:
+    text = compact.compact_for_llm("systems", text, "inspection")
+
+    if not chunking.needs_chunking(text):
+        return extract_systems_window(text)
+
+    windows = chunking.chunk_pages(text)
+    print(f"[INFO] Inspection text split into {len(windows)} windows")
+
+    reduced = reduce_systems(chunking.map_windows(extract_systems_window, windows))
+    validate(reduced)
+
+    return reduced
 
 
 # -----------------------------
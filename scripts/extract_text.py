@@ -1,8 +1,20 @@
 import os
 import sys
-import pdfplumber
+import fitz
 from datetime import datetime
 
+import page_stream
+
+
+# "fitz" (PyMuPDF) is much faster; pages whose fitz output looks scrambled
+# are re-read with pdfplumber. "pdfplumber" uses it for every page.
+BACKENDS = {"fitz", "pdfplumber"}
+TEXT_BACKEND = os.getenv("TEXT_BACKEND", "fitz")
+
+BROKEN_MIN_LINES = 15
+BROKEN_SHORT_LINE = 3
+BROKEN_SHORT_RATIO = 0.5
+
 
 def validate_file(path: str) -> None:
     
@@ -16,41 +28,137 @@ def validate_file(path: str) -> None:
         raise ValueError(f"[ERROR] File is not a PDF: {path}")
 
 
-def extract_text_from_pdf(path: str) -> dict:
-   
+def looks_broken(text: str) -> bool:
+    """
+    Cheap check for fitz output that lost the reading order, which mostly
+    happens on table-heavy pages: most lines shrink to single cells, or the
+    text is full of unmapped glyphs.
+    """
+    if "\ufffd" in text and text.count("\ufffd") > len(text) * 0.01:
+        return True
+
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if len(lines) < BROKEN_MIN_LINES:
+        return False
+
+    short = sum(1 for line in lines if len(line) <= BROKEN_SHORT_LINE)
+    return short / len(lines) > BROKEN_SHORT_RATIO
+
+
+def _page_block(i: int, page_text, report: dict):
+    if page_text and page_text.strip():
+        report["pages_with_text"] += 1
+        report["characters_extracted"] += len(page_text)
+        return f"\n\n--- PAGE {i} ---\n\n" + page_text
+
+    report["pages_empty"] += 1
+    return None
+
+
+def _iter_pdfplumber(path: str, report: dict):
+    import pdfplumber
+
+    with pdfplumber.open(path) as pdf:
+        report["pages_total"] = len(pdf.pages)
+
+        if len(pdf.pages) == 0:
+            raise ValueError("[ERROR] PDF contains zero pages.")
+
+        for i, page in enumerate(pdf.pages, start=1):
+            page_text = page.extract_text()
+
+            # Drop the parsed page objects so memory stays flat on long reports.
+            page.flush_cache()
+
+            block = _page_block(i, page_text, report)
+            if block:
+                yield i, block
+
+
+def _iter_fitz(path: str, report: dict):
+    doc = fitz.open(path)
+    plumber = None
+
+    try:
+        report["pages_total"] = doc.page_count
+
+        if doc.page_count == 0:
+            raise ValueError("[ERROR] PDF contains zero pages.")
+
+        for i in range(1, doc.page_count + 1):
+            page = doc.load_page(i - 1)
+            page_text = page.get_text()
+
+            # Sorting is ~10x slower and pads lines with spaces, so it is
+            # only tried on pages whose plain output lost the reading order.
+            if page_text.strip() and looks_broken(page_text):
+                page_text = page.get_text("text", sort=True)
+
+            if page_text.strip() and looks_broken(page_text):
+                if plumber is None:
+                    import pdfplumber
+                    plumber = pdfplumber.open(path)
+
+                layout_page = plumber.pages[i - 1]
+                page_text = layout_page.extract_text()
+                layout_page.flush_cache()
+                report["pages_escalated"] += 1
+
+            block = _page_block(i, page_text, report)
+            if block:
+                yield i, block
+    finally:
+        doc.close()
+        if plumber is not None:
+            plumber.close()
+
+
+def iter_pages(path: str, report: dict, backend: str = None):
+    """Yield (page_number, text block) one page at a time, updating counters."""
+
+    backend = backend or TEXT_BACKEND
+
+    if backend not in BACKENDS:
+        raise ValueError(f"[ERROR] Unknown text backend: {backend}")
+
+    if backend == "pdfplumber":
+        return _iter_pdfplumber(path, report)
+
+    return _iter_fitz(path, report)
+
+
+def extract_text_from_pdf(path: str, output_path: str, backend: str = None) -> dict:
+    """Stream page text to output_path and return the extraction counters."""
+
     validate_file(path)
 
     extraction_report = {
         "file_path": path,
+        "output_path": output_path,
         "pages_total": 0,
         "pages_with_text": 0,
         "pages_empty": 0,
         "characters_extracted": 0,
-        "extraction_timestamp": datetime.now().isoformat(),
-        "text": ""
+        "pages_escalated": 0,
+        "backend": backend or TEXT_BACKEND,
+        "extraction_timestamp": datetime.now().isoformat()
     }
 
     try:
-        with pdfplumber.open(path) as pdf:
-            extraction_report["pages_total"] = len(pdf.pages)
-
-            if len(pdf.pages) == 0:
-                raise ValueError("[ERROR] PDF contains zero pages.")
-
-            for i, page in enumerate(pdf.pages, start=1):
-                page_text = page.extract_text()
-
-                if page_text and page_text.strip():
-                    extraction_report["pages_with_text"] += 1
-                    extraction_report["characters_extracted"] += len(page_text)
-                    extraction_report["text"] += f"\n\n--- PAGE {i} ---\n\n"
-                    extraction_report["text"] += page_text
-                else:
-                    extraction_report["pages_empty"] += 1
-
+        page_stream.write_pages(
+            iter_pages(path, extraction_report, backend),
+            output_path,
+            check=lambda: sanity_check(extraction_report)
+        )
+    except ValueError:
+        raise
+    except OSError as e:
+        raise RuntimeError(f"[ERROR] Failed to write output file: {str(e)}")
     except Exception as e:
         raise RuntimeError(f"[ERROR] Failed during PDF parsing: {str(e)}")
 
+    print(f"[SUCCESS] Extracted text saved to: {output_path}")
+
     return extraction_report
 
 
@@ -68,24 +176,10 @@ def sanity_check(report: dict) -> None:
     print(f"Pages With Text: {report['pages_with_text']}")
     print(f"Empty Pages: {report['pages_empty']}")
     print(f"Characters Extracted: {report['characters_extracted']}")
+    print(f"Pages Escalated To pdfplumber: {report['pages_escalated']}")
     
 
 
-def save_text_output(report: dict, output_path: str) -> None:
-    """Saving extracted text."""
-
-    if not report["text"]:
-        raise ValueError("[ERROR] No text available to save.")
-
-    try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(report["text"])
-    except Exception as e:
-        raise RuntimeError(f"[ERROR] Failed to write output file: {str(e)}")
-
-    print(f"[SUCCESS] Extracted text saved to: {output_path}")
-
-
 def main():
     if len(sys.argv) != 3:
         print("Usage: python extract_text.py <input_pdf_path> <output_txt_path>")
@@ -96,11 +190,7 @@ def main():
 
     print(f"[INFO] Starting extraction for: {input_pdf}")
 
-    report = extract_text_from_pdf(input_pdf)
-
-    sanity_check(report)
-
-    save_text_output(report, output_txt)
+    extract_text_from_pdf(input_pdf, output_txt)
 
     print("[DONE] Extraction complete.\n")
 
@@ -1,9 +1,32 @@
 import os
+import re
 import sys
+import hashlib
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
 import fitz  
-import easyocr
 
-OCR_TRIGGER_THRESHOLD = 300
+import ocr_cache
+import page_stream
+import tracing
+
+# A page is OCR'd when its text layer is shorter than PAGE_MIN_CHARS, or
+# when it is mostly raster and has fewer than SCANNED_PAGE_MAX_CHARS.
+PAGE_MIN_CHARS = 20
+SCANNED_PAGE_MAX_CHARS = 100
+SCANNED_PAGE_COVERAGE = 0.8
+
+OCR_DPI = 300
+OCR_LANGS = ['en']
+
+# OCR_WORKERS > 1 hands OCR pages to worker processes, each with its own Reader.
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "1"))
+
+# torch intra-op threads per worker; 0 splits the cores evenly.
+OCR_TORCH_THREADS = int(os.getenv("OCR_TORCH_THREADS", "0"))
 
 
 def validate_file(path):
@@ -16,7 +39,7 @@ def validate_file(path):
 def extract_pdf_text(path):
     doc = fitz.open(path)
 
-    text = ""
+    parts = []
     pages = doc.page_count
 
     for i in range(pages):
@@ -24,79 +47,363 @@ def extract_pdf_text(path):
         page_text = page.get_text()
 
         if page_text and page_text.strip():
-            text += f"\n\n--- PAGE {i+1} ---\n\n"
-            text += page_text
+            parts.append(f"\n\n--- PAGE {i+1} ---\n\n" + page_text)
 
     doc.close()
-    return text, pages
+    return "".join(parts), pages
 
 
-def run_easyocr(path):
-    print("[INFO] Starting EasyOCR fallback...")
+def render_page(page):
+    """
+    Render a page to an RGB pixmap and return it with an (h, w, 3) NumPy
+    view over its samples. The view shares memory with the pixmap, so the
+    pixmap has to outlive any use of the array.
 
-    reader = easyocr.Reader(['en'], gpu=False)
-    doc = fitz.open(path)
+    EasyOCR builds the same colour and grey images from this array as it
+    did from the PNG it used to get, so OCR output does not change.
+    """
+    import numpy as np
 
-    ocr_text = ""
+    pix = page.get_pixmap(dpi=OCR_DPI, colorspace=fitz.csRGB, alpha=False)
 
-    for i in range(doc.page_count):
-        print(f"[OCR] Page {i+1}")
+    samples = pix.samples_mv if hasattr(pix, "samples_mv") else pix.samples
+    img = np.frombuffer(samples, dtype=np.uint8)
 
-        page = doc.load_page(i)
+    # Rows may be padded past width * 3 bytes.
+    img = img.reshape(pix.height, pix.stride)[:, :pix.width * 3]
+    img = img.reshape(pix.height, pix.width, 3)
 
-        # Render page to image (NO poppler)
-        pix = page.get_pixmap(dpi=300)
-        img_bytes = pix.tobytes("png")
+    return pix, img
 
-        results = reader.readtext(img_bytes, detail=0)
 
-        if results:
-            ocr_text += f"\n\n--- OCR PAGE {i+1} ---\n\n"
-            for line in results:
-                ocr_text += line + "\n"
+_readtext_lock = threading.Lock()
 
-    doc.close()
-    return ocr_text
 
+def ocr_page(reader, doc, i):
+    page = doc.load_page(i)
 
-def save(text, out):
-    if not text.strip():
-        raise ValueError("[ERROR] No text extracted.")
+    # Render page to image (NO poppler). Handing EasyOCR an array view skips
+    # a PNG encode/decode per page.
+    with tracing.span("ocr_render", "ocr", page=i + 1, dpi=OCR_DPI):
+        pix, img = render_page(page)
 
-    with open(out, "w", encoding="utf-8") as f:
-        f.write(text)
+    # One readtext at a time per process: the Reader is shared, and torch
+    # already spreads a single call over the cores.
+    with _readtext_lock, tracing.span("ocr_readtext", "ocr", page=i + 1) as info:
+        results = reader.readtext(img, detail=0)
+        info["lines"] = len(results)
 
-    print(f"[SUCCESS] Saved → {out}")
+    del img, pix
+    return results
 
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: python extract_text_easyocr_fitz.py <input_pdf> <output_txt>")
-        sys.exit(1)
+def format_ocr_page(i, results):
+    if not results:
+        return ""
 
-    pdf = sys.argv[1]
-    out = sys.argv[2]
+    return f"\n\n--- OCR PAGE {i+1} ---\n\n" + "".join(line + "\n" for line in results)
+
+
+# -----------------------------
+# Multi-process OCR workers
+# -----------------------------
+
+# easyocr pulls in torch (seconds of import time), so it is only imported
+# once a page actually needs OCR. Text-layer PDFs never load it.
+
+_worker_reader = None
+_worker_doc = None
+
+
+def _init_ocr_worker(path, torch_threads, trace):
+    global _worker_reader, _worker_doc
+
+    if trace:
+        tracing.enable()
+
+    # Each worker gets a slice of the cores; letting every process spawn
+    # one torch thread per core oversubscribes the CPU badly.
+    import torch
+    import easyocr
+    torch.set_num_threads(torch_threads)
+
+    _worker_reader = easyocr.Reader(OCR_LANGS, gpu=False)
+    _worker_doc = fitz.open(path)
+
+
+def _ocr_worker_page(i):
+    print(f"[OCR] Page {i+1} (pid {os.getpid()})")
+    lines = ocr_page(_worker_reader, _worker_doc, i)
+
+    # Page timings recorded in the worker travel back with the text.
+    return {"lines": lines, "trace": tracing.drain()}
+
+
+def ocr_pool(path, workers):
+    torch_threads = OCR_TORCH_THREADS or max(1, (os.cpu_count() or 1) // workers)
+
+    # spawn, not fork: the pool is created from a DAG worker thread while
+    # the LLM client loop, sibling stages and the stdout/tracing locks are
+    # live, and a forked child can deadlock on any lock it inherits held.
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_ocr_worker,
+        initargs=(path, torch_threads, tracing.enabled()),
+    )
+
+
+_reader = None
+_reader_lock = threading.Lock()
+
+
+def get_reader():
+    global _reader
+
+    # inspection_text and thermal_text run side by side; without the lock
+    # both could load the model.
+    with _reader_lock:
+        if _reader is None:
+            import easyocr
+            _reader = easyocr.Reader(OCR_LANGS, gpu=False)
+
+    return _reader
+
+
+# -----------------------------
+# Page fingerprints (OCR cache keys)
+# -----------------------------
+
+DO_RE = re.compile(rb"/([^\s/\[\]()<>{}%]+)\s+Do\b")
+
+
+def drawn_xobjects(page) -> list:
+    """
+    (xref, is_form) for every XObject a page actually draws, in drawing
+    order, following Do operators into form XObjects.
+
+    Some generators put every image of the file into one shared resource
+    dictionary, so page.get_images() lists all of them on every page. The
+    content streams say which ones are painted.
+    """
+    doc = page.parent
+
+    # (referencing xref, resource name) -> xref; 0 is the page itself.
+    names = {}
+    for xref, *_, name, _filter, referencer in page.get_images(full=True):
+        names.setdefault((referencer, name), (xref, False))
+    for xref, name, invoker, _bbox in page.get_xobjects():
+        names.setdefault((invoker, name), (xref, True))
+
+    drawn = []
+    seen = set()
 
+    def walk(container, stream):
+        for raw in DO_RE.findall(stream):
+            name = raw.decode("latin-1")
+            # Forms without their own resources use the page's.
+            hit = names.get((container, name)) or names.get((0, name))
+            if hit is None or hit[0] in seen:
+                continue
+
+            seen.add(hit[0])
+            drawn.append(hit)
+
+            if hit[1]:
+                walk(hit[0], doc.xref_stream(hit[0]) or b"")
+
+    walk(0, page.read_contents())
+    return drawn
+
+
+def drawn_images(page) -> list:
+    """xrefs of the images a page actually draws, in drawing order."""
+    xrefs = [xref for xref, is_form in drawn_xobjects(page) if not is_form]
+
+    if xrefs:
+        return xrefs
+
+    # Slower, but catches anything the name lookup could not resolve.
+    return list(dict.fromkeys(
+        info["xref"] for info in page.get_image_info(xrefs=True) if info["xref"]
+    ))
+
+
+def page_fingerprint(doc, page) -> str:
+    """
+    Hash of what a page renders from: its geometry, content stream, the
+    streams and placement of the form XObjects it draws (recursively) and
+    the raw bytes of the images. The same page in a revised report hashes
+    the same, wherever it sits in the file.
+    """
+    h = hashlib.sha256()
+    h.update(f"{tuple(page.rect)}|{page.rotation}".encode("utf-8"))
+    h.update(hashlib.sha256(page.read_contents()).digest())
+
+    for xref, is_form in drawn_xobjects(page):
+        if is_form:
+            for key in ("BBox", "Matrix"):
+                h.update(doc.xref_get_key(xref, key)[1].encode("latin-1"))
+            h.update(hashlib.sha256(doc.xref_stream(xref) or b"").digest())
+        else:
+            h.update(hashlib.sha256(doc.xref_stream_raw(xref) or b"").digest())
+
+    return h.hexdigest()
+
+
+def page_key(doc, page, version) -> str:
+    return ocr_cache.make_key(page_fingerprint(doc, page), OCR_DPI, OCR_LANGS, version)
+
+
+def cached_ocr(cache, key, i):
+    lines = cache.get(key)
+
+    if lines is not None:
+        print(f"[CACHE] OCR page {i+1} hit ({key[:12]})")
+        tracing.event("ocr_cache_hit", "cache", page=i + 1, key=key[:12])
+
+    return lines
+
+
+# -----------------------------
+# Per-page OCR selection
+# -----------------------------
+
+def image_coverage(page):
+    """Fraction of the page area covered by raster images."""
+    page_area = page.rect.get_area()
+    if not page_area:
+        return 0.0
+
+    covered = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"]) & page.rect
+        if not bbox.is_empty:
+            covered += bbox.get_area()
+
+    return min(1.0, covered / page_area)
+
+
+def needs_ocr(page, text):
+    chars = len(text.strip())
+
+    if chars < PAGE_MIN_CHARS:
+        return True
+
+    # A scan with a thin text layer (page numbers, stamps) still needs OCR.
+    return chars < SCANNED_PAGE_MAX_CHARS and image_coverage(page) >= SCANNED_PAGE_COVERAGE
+
+
+def _waiting(ocr):
+    return isinstance(ocr, Future) and not ocr.done()
+
+
+def iter_page_blocks(pdf, stats, workers):
+    """
+    Yield (page_number, text block) in page order from one pass over the
+    document. Pages picked for OCR are either OCR'd inline or, with several
+    workers, submitted to the pool as they are found; pages behind a pending
+    OCR page are held back only until that page is done.
+    """
+    doc = fitz.open(pdf)
+    stats["pages_total"] = doc.page_count
+
+    pool = None
+    pending = deque()
+
+    # The cache is opened on the first page that needs OCR.
+    version = ocr_cache.easyocr_version()
+    keys = {}
+
+    def emit(i, page_text, ocr):
+        if page_text.strip():
+            stats["pages_with_text"] += 1
+            stats["characters"] += len(page_text.strip())
+            yield i + 1, f"\n\n--- PAGE {i+1} ---\n\n" + page_text
+
+        if ocr is not None:
+            if isinstance(ocr, Future):
+                done = ocr.result()
+                tracing.extend(done["trace"])
+                lines = done["lines"]
+                ocr_cache.get_cache().put(keys.pop(i), lines)
+            else:
+                lines = ocr
+            block = format_ocr_page(i, lines)
+            stats["pages_ocr"] += 1
+            stats["characters"] += sum(len(line) for line in lines)
+            if block:
+                yield i + 1, block
+
+    try:
+        for i in range(doc.page_count):
+            page = doc.load_page(i)
+            page_text = page.get_text()
+            ocr = None
+
+            if needs_ocr(page, page_text):
+                key = page_key(doc, page, version)
+                ocr = cached_ocr(ocr_cache.get_cache(), key, i)
+
+                if ocr is None and workers > 1:
+                    if pool is None:
+                        pool = ocr_pool(pdf, workers)
+                    ocr = pool.submit(_ocr_worker_page, i)
+                    keys[i] = key
+                elif ocr is None:
+                    print(f"[OCR] Page {i+1}")
+                    ocr = ocr_page(get_reader(), doc, i)
+                    ocr_cache.get_cache().put(key, ocr)
+
+            pending.append((i, page_text, ocr))
+
+            while pending and not _waiting(pending[0][2]):
+                yield from emit(*pending.popleft())
+
+        while pending:
+            yield from emit(*pending.popleft())
+    finally:
+        doc.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def extract_with_fallback(pdf, output_path, workers=None):
     validate_file(pdf)
 
-    print("[INFO] Running PyMuPDF extraction...")
-    text, pages = extract_pdf_text(pdf)
+    workers = workers or OCR_WORKERS
 
-    base_chars = len(text.strip())
+    stats = {
+        "pages_total": 0,
+        "pages_with_text": 0,
+        "pages_ocr": 0,
+        "characters": 0,
+    }
 
-    print(f"[INFO] Pages: {pages}")
-    print(f"[INFO] Characters (primary): {base_chars}")
+    def check():
+        if stats["characters"] == 0:
+            raise ValueError("[ERROR] No text extracted.")
 
-    if base_chars < OCR_TRIGGER_THRESHOLD:
-        print("[WARNING] Low text detected → triggering EasyOCR")
-        ocr = run_easyocr(pdf)
-        text += "\n\n--- OCR MERGED CONTENT ---\n\n"
-        text += ocr
+    print("[INFO] Running PyMuPDF extraction with per-page OCR...")
+    page_stream.write_pages(iter_page_blocks(pdf, stats, workers), output_path, check=check)
 
-    final_chars = len(text.strip())
-    print(f"[INFO] Final character count: {final_chars}")
+    print(f"[INFO] Pages: {stats['pages_total']}")
+    print(f"[INFO] Pages OCR'd: {stats['pages_ocr']}")
+    print(f"[INFO] Final character count: {stats['characters']}")
+    print(f"[SUCCESS] Saved → {output_path}")
+
+    return stats
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python extract_text_easyocr_fitz.py <input_pdf> <output_txt>")
+        sys.exit(1)
+
+    pdf = sys.argv[1]
+    out = sys.argv[2]
 
-    save(text, out)
+    extract_with_fallback(pdf, out)
     print("[DONE] Extraction complete.")
 
 
@@ -1,21 +1,19 @@
 import os
+import re
 import json
 import sys
 from typing import Any
-from dotenv import load_dotenv
-from openai import OpenAI
 
+import compact
+import llm_cache
+import repair
+import thermal_analytics
 
-MODEL_NAME = "gpt-4o-mini"
 
+MODEL_NAME = "gpt-4o-mini"
 
+MOISTURE_THRESHOLD = thermal_analytics.MOISTURE_THRESHOLD
 
-def load_api():
-    load_dotenv()
-    key = os.getenv("OPENAI_API_KEY")
-    if not key:
-        raise ValueError("[ERROR] OPENAI_API_KEY missing.")
-    return OpenAI(api_key=key)
 
 
 def read_text(path: str) -> str:
@@ -68,6 +66,53 @@ Thermal Text:
 
 
 
+REQUIRED = {
+    "image_name",
+    "hotspot_temp",
+    "coldspot_temp",
+    "temperature_difference",
+    "moisture_indicator",
+    "area_reference",
+    "confidence"
+}
+
+ITEM_SCHEMA = """{
+  "image_name": "string",
+  "hotspot_temp": number,
+  "coldspot_temp": number,
+  "temperature_difference": number,
+  "moisture_indicator": "Yes | No",
+  "area_reference": "string or Not Available",
+  "confidence": "High | Medium | Low"
+}"""
+
+
+def reading_problems(item: Any) -> list:
+    if not isinstance(item, dict):
+        return ["Reading is not an object"]
+
+    missing = REQUIRED - item.keys()
+    if missing:
+        return [f"Missing keys: {missing}"]
+
+    problems = []
+
+    for field in ("hotspot_temp", "coldspot_temp", "temperature_difference"):
+        if not isinstance(item[field], (int, float)) or isinstance(item[field], bool):
+            problems.append(f"Invalid {field}")
+
+    if not problems:
+        computed_diff = round(item["hotspot_temp"] - item["coldspot_temp"], 2)
+
+        if abs(computed_diff - item["temperature_difference"]) > 0.1:
+            problems.append("Incorrect temperature_difference")
+
+    if item["moisture_indicator"] not in ("Yes", "No"):
+        problems.append("Invalid moisture_indicator")
+
+    return problems
+
+
 def validate(data: Any):
     if "thermal_readings" not in data:
         raise ValueError("[ERROR] Missing 'thermal_readings' key.")
@@ -75,67 +120,193 @@ def validate(data: Any):
     if not isinstance(data["thermal_readings"], list):
         raise ValueError("[ERROR] thermal_readings must be a list.")
 
-    for idx, item in enumerate(data["thermal_readings"]):
-        required = {
-            "image_name",
-            "hotspot_temp",
-            "coldspot_temp",
-            "temperature_difference",
-            "moisture_indicator",
-            "area_reference",
-            "confidence"
-        }
+    readings = data["thermal_readings"]
+    bad = thermal_analytics.invalid_rows(readings, REQUIRED)
 
-        missing = required - item.keys()
-        if missing:
-            raise ValueError(f"[ERROR] Missing keys in reading {idx}: {missing}")
+    if bad.size:
+        idx = int(bad[0])
+        problem = (reading_problems(readings[idx]) or ["Invalid reading"])[0]
+        raise ValueError(f"[ERROR] {problem} in reading {idx} ({bad.size} invalid)")
 
-        if not isinstance(item["hotspot_temp"], (int, float)):
-            raise ValueError(f"[ERROR] Invalid hotspot_temp at index {idx}")
 
-        if not isinstance(item["coldspot_temp"], (int, float)):
-            raise ValueError(f"[ERROR] Invalid coldspot_temp at index {idx}")
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
 
-        computed_diff = round(
-            item["hotspot_temp"] - item["coldspot_temp"], 2
-        )
+    if isinstance(value, str):
+        match = re.search(r"-?\d+(?:[.,]\d+)?", value)
+        if match:
+            return float(match.group(0).replace(",", "."))
 
-        if abs(computed_diff - item["temperature_difference"]) > 0.1:
-            raise ValueError(
-                f"[ERROR] Incorrect temperature_difference at index {idx}"
-            )
+    return value
 
-        if item["moisture_indicator"] not in {"Yes", "No"}:
-            raise ValueError(
-                f"[ERROR] Invalid moisture_indicator at index {idx}"
-            )
 
+def fix_reading(item: Any) -> Any:
+    """
+    Local fixes: parse "24.5 °C" strings, recompute temperature_difference
+    and moisture_indicator from the two spot temperatures, and default
+    area_reference.
+    """
+    if not isinstance(item, dict):
+        return item
 
+    fixed = dict(item)
+
+    for field in ("hotspot_temp", "coldspot_temp", "temperature_difference"):
+        if field in fixed:
+            fixed[field] = _number(fixed[field])
+
+    hot, cold = fixed.get("hotspot_temp"), fixed.get("coldspot_temp")
+
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (hot, cold)):
+        diff = round(hot - cold, 2)
+        fixed["temperature_difference"] = diff
+        fixed["moisture_indicator"] = "Yes" if diff >= MOISTURE_THRESHOLD else "No"
+
+    if not fixed.get("area_reference"):
+        fixed["area_reference"] = "Not Available"
+
+    if fixed.get("confidence") not in ("High", "Medium", "Low"):
+        fixed["confidence"] = "Low"
+
+    return fixed
+
+
+def parse_response(raw: str) -> dict:
+    parsed = repair.loads(raw)
+
+    if not isinstance(parsed, dict) or not isinstance(parsed.get("thermal_readings"), list):
+        raise ValueError("[ERROR] Missing 'thermal_readings' list in response.")
+
+    return parsed
+
+
+# -----------------------------
+# Deterministic page parser (Bosch GTC 400 C layout)
+# -----------------------------
+
+PAGE_MARKER = re.compile(r"^--- (?:OCR )?PAGE (\d+) ---$", re.MULTILINE)
+
+TEMPERATURE = r"(-?\d+(?:[.,]\d+)?)\s*°?\s*C\b"
+
+HOTSPOT_RE = re.compile(r"Hotspot\s*:\s*" + TEMPERATURE, re.IGNORECASE)
+COLDSPOT_RE = re.compile(r"Coldspot\s*:\s*" + TEMPERATURE, re.IGNORECASE)
+IMAGE_RE = re.compile(r"Thermal image\s*:\s*([\w-]+\.jpe?g)", re.IGNORECASE)
+
+
+def split_pages(text: str) -> list:
+    """Split extracted text into (page_number, body) pairs in file order."""
+    markers = list(PAGE_MARKER.finditer(text))
+
+    if not markers:
+        return [(None, text)]
+
+    pages = []
+    for m, nxt in zip(markers, markers[1:] + [None]):
+        end = nxt.start() if nxt else len(text)
+        pages.append((int(m.group(1)), text[m.end():end]))
+
+    return pages
+
+
+def _single(pattern, body):
+    matches = pattern.findall(body)
+    return matches[0] if len(matches) == 1 else None
 
-def extract_thermal(text: str) -> dict:
-    client = load_api()
 
+def parse_page(body: str):
+    """Return a thermal reading for a regular camera page, or None."""
+    hotspot = _single(HOTSPOT_RE, body)
+    coldspot = _single(COLDSPOT_RE, body)
+    image = _single(IMAGE_RE, body)
+
+    if hotspot is None or coldspot is None or image is None:
+        return None
+
+    hot = float(hotspot.replace(",", "."))
+    cold = float(coldspot.replace(",", "."))
+    diff = round(hot - cold, 2)
+
+    return {
+        "image_name": image,
+        "hotspot_temp": hot,
+        "coldspot_temp": cold,
+        "temperature_difference": diff,
+        "moisture_indicator": "Yes" if diff >= MOISTURE_THRESHOLD else "No",
+        "area_reference": "Not Available",
+        "confidence": "High"
+    }
+
+
+def extract_thermal_llm(text: str) -> dict:
     prompt = build_prompt(text)
 
-    response = client.chat.completions.create(
-        model=MODEL_NAME,
-        temperature=0,
-        messages=[
+    data = llm_cache.complete(
+        MODEL_NAME,
+        [
             {"role": "system", "content": "Return strict JSON only."},
             {"role": "user", "content": prompt}
         ],
+        temperature=0,
+        parse=parse_response,
     )
 
-    raw = response.choices[0].message.content.strip()
+    readings = repair.repair_items(
+        "thermal",
+        data["thermal_readings"],
+        reading_problems,
+        fix=fix_reading,
+        ask=lambda failing: repair.reask(MODEL_NAME, ITEM_SCHEMA, text, failing),
+    )
 
-    try:
-        parsed = json.loads(raw)
-    except json.JSONDecodeError:
-        raise ValueError("[ERROR] LLM did not return valid JSON.")
+    return {"thermal_readings": readings}
 
-    validate(parsed)
 
-    return parsed
+def extract_thermal(text: str) -> dict:
+    readings = []
+    parsed_pages = set()
+    leftover = []
+    skipped = 0
+
+    for number, body in split_pages(text):
+        reading = parse_page(body)
+
+        if reading:
+            readings.append(reading)
+            parsed_pages.add(number)
+        elif body.strip():
+            # Other camera layouts (FLIR "Sp1" / "Bx1 Max", ...) are left to
+            # the model rather than guessed at here.
+            leftover.append((number, body))
+        else:
+            skipped += 1
+
+    # Native and OCR copies of the same page share a number; once either
+    # copy parsed there is nothing left for the model to find.
+    leftover = [(n, b) for n, b in leftover if n is None or n not in parsed_pages]
+
+    if leftover:
+        numbers = ", ".join(str(n) for n, _ in leftover if n is not None) or "unnumbered text"
+        print(f"[INFO] {len(leftover)} page(s) not parseable ({numbers}) → sending to LLM")
+        llm_text = "".join(
+            f"\n\n--- PAGE {n} ---\n\n{b}" if n is not None else b
+            for n, b in leftover
+        )
+        llm_text = compact.compact_for_llm("thermal", llm_text, "thermal")
+        readings += extract_thermal_llm(llm_text)["thermal_readings"]
+
+    result = {
+        "thermal_readings": readings,
+        "extraction_paths": {
+            "parser": len(parsed_pages),
+            "llm": len(leftover),
+            "skipped": skipped
+        }
+    }
+
+    validate(result)
+
+    return result
 
 
 
@@ -161,7 +332,9 @@ def main():
     print("[INFO] Extracting thermal readings...")
     thermal_data = extract_thermal(text)
 
+    paths = thermal_data["extraction_paths"]
     print(f"[INFO] Extracted {len(thermal_data['thermal_readings'])} readings.")
+    print(f"[INFO] Pages by path: parser={paths['parser']}, llm={paths['llm']}, skipped={paths['skipped']}")
 
     save(thermal_data, output_path)
 
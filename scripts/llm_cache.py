@@ -0,0 +1,79 @@
+import os
+import hashlib
+
+import llm_client
+import sqlite_cache
+import tracing
+
+
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data",
+    ".llm_cache.sqlite",
+)
+
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", DEFAULT_PATH)
+MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+TTL_SECONDS = int(float(os.getenv("LLM_CACHE_TTL_DAYS", "30")) * 86400)
+
+# Reads are skipped but fresh responses are still written back.
+BYPASS = os.getenv("LLM_CACHE_BYPASS", "").lower() in {"1", "true", "yes"}
+
+
+def make_key(model: str, temperature: float, messages: list) -> str:
+    system = "\n".join(m["content"] for m in messages if m["role"] == "system")
+    prompt = "\n".join(m["content"] for m in messages if m["role"] != "system")
+
+    h = hashlib.sha256()
+    for part in (model, repr(float(temperature)), system):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    h.update(hashlib.sha256(prompt.encode("utf-8")).digest())
+
+    return h.hexdigest()
+
+
+_cache = sqlite_cache.Singleton(
+    lambda: sqlite_cache.SQLiteCache(CACHE_PATH, "responses", MAX_BYTES, TTL_SECONDS, BYPASS)
+)
+
+
+def get_cache() -> sqlite_cache.SQLiteCache:
+    return _cache.get()
+
+
+def complete(model: str, messages: list, temperature: float = 0, parse=None):
+    """
+    Return the completion for `messages`, from the cache when possible.
+
+    The API is only reached on a miss, so cached runs need neither an API
+    key nor network access. If `parse` is given it is applied to the raw
+    text and the response is cached only when parsing succeeds, so a reply
+    that failed validation is never replayed on retry.
+    """
+    cache = get_cache()
+    key = make_key(model, temperature, messages)
+
+    raw = cache.get(key)
+    if raw is not None:
+        print(f"[CACHE] LLM response hit ({key[:12]})")
+        tracing.event("llm_cache_hit", "cache", model=model, key=key[:12])
+        return parse(raw) if parse else raw
+
+    raw = llm_client.chat(model, messages, temperature)["content"]
+    result = parse(raw) if parse else raw
+
+    cache.put(key, raw)
+
+    return result
+
+
+def print_stats():
+    if _cache.cache is None:
+        return
+
+    s = _cache.cache.stats()
+    print(
+        f"[CACHE] LLM responses: {s['hits']} hits, {s['misses']} misses "
+        f"({s['entries']} entries, {s['bytes'] / 1024:.1f} KiB on disk)"
+    )
@@ -0,0 +1,176 @@
+import os
+import time
+import random
+import asyncio
+import threading
+
+import tracing
+
+
+# Concurrency, retry and timeout settings for every LLM call in a process.
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT", "60"))
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+
+RETRY_STATUS = {408, 409, 429}
+
+
+class LLMError(RuntimeError):
+    pass
+
+
+def _is_retryable(exc) -> bool:
+    import openai
+
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, asyncio.TimeoutError)):
+        return True
+
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in RETRY_STATUS or exc.status_code >= 500
+
+    return False
+
+
+def _retry_after(exc):
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after=None) -> float:
+    """Exponential backoff with full jitter, never below a server Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+
+    return delay
+
+
+class AsyncLLMClient:
+    """
+    One pooled AsyncOpenAI client per process, running on a private event
+    loop thread. Synchronous callers (the stage functions, which run on the
+    pipeline's thread pool) share its semaphore and HTTP connections.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES, timeout=TIMEOUT_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.stats = {"calls": 0, "retries": 0, "failures": 0}
+
+        self._client = None
+        self._semaphore = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-client", daemon=True)
+        self._thread.start()
+
+    def _ensure_client(self):
+        if self._client is not None:
+            return
+
+        import httpx
+        from dotenv import load_dotenv
+        from openai import AsyncOpenAI
+
+        load_dotenv()
+        key = os.getenv("OPENAI_API_KEY")
+        if not key:
+            raise ValueError("[ERROR] OPENAI_API_KEY missing.")
+
+        limits = httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency,
+        )
+
+        # Retries are handled here, so the SDK's own retry loop is disabled.
+        self._client = AsyncOpenAI(
+            api_key=key,
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            max_retries=0,
+            timeout=self.timeout,
+            http_client=httpx.AsyncClient(limits=limits, timeout=self.timeout),
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def ensure_ready(self):
+        """Create the HTTP client now rather than on the first call."""
+        self._ensure_client()
+
+    async def achat(self, model: str, messages: list, temperature: float = 0) -> dict:
+        self._ensure_client()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    self.stats["calls"] += 1
+                    started = time.perf_counter()
+
+                    response = await asyncio.wait_for(
+                        self._client.chat.completions.create(
+                            model=model,
+                            temperature=temperature,
+                            messages=messages,
+                        ),
+                        timeout=self.timeout,
+                    )
+
+                usage = response.usage
+                result = {
+                    "content": response.choices[0].message.content.strip(),
+                    "prompt_tokens": getattr(usage, "prompt_tokens", None),
+                    "completion_tokens": getattr(usage, "completion_tokens", None),
+                    "latency_s": round(time.perf_counter() - started, 4),
+                }
+
+                tracing.add_span(
+                    "llm_call", "llm", started, result["latency_s"],
+                    model=model,
+                    prompt_tokens=result["prompt_tokens"],
+                    completion_tokens=result["completion_tokens"],
+                    attempt=attempt + 1,
+                )
+                return result
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    self.stats["failures"] += 1
+                    raise LLMError(f"[ERROR] LLM call failed after {attempt + 1} attempt(s): {e}") from e
+
+                self.stats["retries"] += 1
+                delay = backoff_delay(attempt, _retry_after(e))
+                tracing.event("llm_retry", "llm", model=model, error=type(e).__name__, delay_s=round(delay, 3))
+                print(f"[WARNING] LLM call failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def run(self, coro):
+        """Run a coroutine on the client loop from any thread and wait for it."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def chat(self, model: str, messages: list, temperature: float = 0) -> dict:
+        return self.run(self.achat(model, messages, temperature))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> AsyncLLMClient:
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            _client = AsyncLLMClient()
+
+    return _client
+
+
+def chat(model: str, messages: list, temperature: float = 0) -> dict:
+    return get_client().chat(model, messages, temperature)
@@ -1,6 +1,13 @@
+import re
 import json
+import math
 import sys
 import os
+import difflib
+
+import diagnostic_store
+import rules
+import thermal_analytics
 
 
 
@@ -20,63 +27,132 @@ def save_json(data, path):
 
 
 
-def attach_thermal(areas, thermal):
-    readings = thermal.get("thermal_readings", [])
+# -----------------------------
+# Thermal → area matching
+# -----------------------------
 
-    for area in areas:
-        area_name = area["area_name"].lower()
+# Near matches ("Bedroom 1" → "Bedroom", "bathrom" → "bathroom") are scored
+# when no area contains every word of the reading's area_reference.
+FUZZY_MATCH = os.getenv("THERMAL_FUZZY_MATCH", "1").lower() not in {"0", "false", "no"}
+MIN_MATCH_SCORE = float(os.getenv("THERMAL_MATCH_MIN_SCORE", "0.5"))
+TYPO_CUTOFF = 0.85
 
-        matched = []
+TOKEN_RE = re.compile(r"[a-z0-9]+")
 
-        for t in readings:
-            ref = t["area_reference"].lower()
 
-            if ref != "not available" and ref in area_name:
-                matched.append(t)
+def tokenize(name):
+    return set(TOKEN_RE.findall(name.lower()))
 
-        if matched:
-            area["thermal_confirmation"] = "Moisture Detected"
-        else:
-            area["thermal_confirmation"] = "Not Available"
 
-    return areas
+def build_area_index(areas):
+    """Inverted index: token → indices of the areas whose name contains it."""
+    tokens = [tokenize(a["area_name"]) for a in areas]
+    postings = {}
 
+    for i, toks in enumerate(tokens):
+        for tok in toks:
+            postings.setdefault(tok, []).append(i)
 
+    # Rare words ("nahani", "parking") say more about the area than common ones.
+    idf = {tok: math.log(1 + len(areas) / len(ids)) for tok, ids in postings.items()}
 
-def infer_root_causes(systems):
-    causes = []
+    return {"tokens": tokens, "postings": postings, "idf": idf, "typos": {}}
 
-    if systems["bathroom_issues"]["tile_joint_gaps"] == "Yes":
-        causes.append("Bathroom waterproofing failure")
 
-    if systems["external_wall"]["cracks_present"] == "Yes":
-        causes.append("External wall crack ingress")
+def _known_token(index, tok):
+    if tok in index["postings"]:
+        return tok
 
-    if systems["terrace"]["surface_cracks"] == "Yes":
-        causes.append("Terrace surface deterioration")
+    typos = index["typos"]
+    if tok not in typos:
+        close = difflib.get_close_matches(tok, index["postings"].keys(), n=1, cutoff=TYPO_CUTOFF)
+        typos[tok] = close[0] if close else None
 
-    if systems["parking"]["ceiling_leakage"] == "Yes":
-        causes.append("Vertical moisture migration")
+    return typos[tok]
 
-    return list(set(causes))
 
+def match_area_reference(index, ref, fuzzy=FUZZY_MATCH):
+    """
+    Return the indices of the areas a reading's area_reference points to.
 
+    Every area whose name contains all words of the reference matches
+    exactly. Failing that, and with fuzzy matching on, the areas with the
+    best IDF-weighted Dice overlap above MIN_MATCH_SCORE match.
+    """
+    ref_tokens = tokenize(ref)
+    if not ref_tokens:
+        return []
 
-def compute_severity(areas, systems):
-    impacted = len(areas)
+    postings = index["postings"]
+
+    candidates = set.intersection(*(set(postings.get(t, ())) for t in ref_tokens))
+    if candidates or not fuzzy:
+        return sorted(candidates)
+
+    known = {_known_token(index, t) for t in ref_tokens} - {None}
+    if not known:
+        return []
 
-    bathroom = systems["bathroom_issues"]["tile_joint_gaps"] == "Yes"
-    terrace = systems["terrace"]["surface_cracks"] == "Yes"
-    external = systems["external_wall"]["cracks_present"] == "Yes"
-    parking = systems["parking"]["ceiling_leakage"] == "Yes"
+    idf = index["idf"]
+    unknown = len(ref_tokens) - len(known)
+    ref_weight = sum(idf[t] for t in known) + unknown * max(idf.values())
 
-    if impacted >= 4 and (bathroom or terrace) and parking:
-        return "High"
+    scores = {}
+    for i in {i for t in known for i in postings[t]}:
+        area_tokens = index["tokens"][i]
+        shared = sum(idf[t] for t in known & area_tokens)
+        scores[i] = 2 * shared / (ref_weight + sum(idf[t] for t in area_tokens))
 
-    if impacted >= 2 and (bathroom or external):
-        return "Moderate"
+    best = max(scores.values())
+    if best < MIN_MATCH_SCORE:
+        return []
+
+    return sorted(i for i, score in scores.items() if score == best)
+
+
+def attach_thermal(areas, thermal, fuzzy=FUZZY_MATCH):
+    readings = thermal.get("thermal_readings", [])
+    index = build_area_index(areas)
 
-    return "Low"
+    matched = [[] for _ in areas]
+    lookups = {}
+
+    for t in readings:
+        ref = t["area_reference"].strip()
+
+        if not ref or ref.lower() == "not available":
+            continue
+
+        if ref not in lookups:
+            lookups[ref] = match_area_reference(index, ref, fuzzy)
+
+        for i in lookups[ref]:
+            matched[i].append(t)
+
+    for area, hits in zip(areas, matched):
+        if hits:
+            area["thermal_confirmation"] = "Moisture Detected"
+            area["thermal_images"] = [t["image_name"] for t in hits]
+            area["max_temperature_difference"] = max(t["temperature_difference"] for t in hits)
+        else:
+            area["thermal_confirmation"] = "Not Available"
+            area["thermal_images"] = []
+            area["max_temperature_difference"] = None
+
+    return areas
+
+
+
+# -----------------------------
+# Root causes + severity (rules.py)
+# -----------------------------
+
+def infer_root_causes(systems):
+    return rules.evaluate(rules.default_plan(), [([], systems)])[0]["primary_root_causes"]
+
+
+def compute_severity(areas, systems):
+    return rules.evaluate(rules.default_plan(), [(areas, systems)])[0]["severity"]
 
 
 # -----------------------------
@@ -120,35 +196,49 @@ def validate(diagnostic):
 
 
 
-def main():
-    if len(sys.argv) != 5:
-        print("Usage: python merge.py areas.json systems.json thermal.json diagnostic.json")
-        sys.exit(1)
+def image_files(thermal, images):
+    """
+    image_name -> the camera images stored by thermal_images.py, for every
+    reading whose page was found in the image index.
+    """
+    pages = {}
+    for page in images.get("images", []):
+        if page["image_name"]:
+            pages.setdefault(page["image_name"], page)
 
-    areas_path = sys.argv[1]
-    systems_path = sys.argv[2]
-    thermal_path = sys.argv[3]
-    output_path = sys.argv[4]
+    files = {}
+    for t in thermal.get("thermal_readings", []):
+        page = pages.get(t["image_name"])
+        if page:
+            files[t["image_name"]] = {
+                "page": page["page"],
+                "thermal": page["thermal"]["path"],
+                "visual": [v["path"] for v in page["visual"]],
+            }
+
+    return files
 
-    print("[INFO] Loading inputs...")
-    areas_data = load_json(areas_path)
-    systems = load_json(systems_path)
-    thermal = load_json(thermal_path)
 
+def build_diagnostic(areas_data, systems, thermal, images=None):
     areas = areas_data["areas"]
 
     print("[INFO] Attaching thermal...")
     areas = attach_thermal(areas, thermal)
 
-    print("[INFO] Inferring root causes...")
-    root_causes = infer_root_causes(systems)
-
-    print("[INFO] Computing severity...")
-    severity = compute_severity(areas, systems)
+    print("[INFO] Inferring root causes and severity...")
+    scored = rules.evaluate(rules.default_plan(), [(areas, systems)])[0]
+    root_causes = scored["primary_root_causes"]
+    severity = scored["severity"]
 
     print("[INFO] Detecting missing data...")
     missing = detect_missing(areas, systems)
 
+    print("[INFO] Summarising thermal readings...")
+    thermal_summary = thermal_analytics.summarise(
+        thermal.get("thermal_readings", []),
+        {a["area_name"]: a["thermal_images"] for a in areas},
+    )
+
     diagnostic = {
         "areas": areas,
         "bathroom_issues": systems["bathroom_issues"],
@@ -159,13 +249,49 @@ def main():
             "primary_root_causes": root_causes,
             "severity": severity,
             "missing_information": missing
-        }
+        },
+        "thermal_summary": thermal_summary
     }
 
+    if images is not None:
+        diagnostic["thermal_image_files"] = image_files(thermal, images)
+
     print("[INFO] Running validation...")
     validate(diagnostic)
 
+    return diagnostic
+
+
+
+def main():
+    args = sys.argv[1:]
+    building_id = None
+
+    if "--building-id" in args[:-1]:
+        i = args.index("--building-id")
+        building_id = args[i + 1]
+        del args[i:i + 2]
+
+    if len(args) not in (4, 5):
+        print("Usage: python merge.py areas.json systems.json thermal.json diagnostic.json "
+              "[thermal_images.json] [--building-id ID]")
+        sys.exit(1)
+
+    areas_path = args[0]
+    systems_path = args[1]
+    thermal_path = args[2]
+    output_path = args[3]
+
+    print("[INFO] Loading inputs...")
+    areas_data = load_json(areas_path)
+    systems = load_json(systems_path)
+    thermal = load_json(thermal_path)
+    images = load_json(args[4]) if len(args) == 5 else None
+
+    diagnostic = build_diagnostic(areas_data, systems, thermal, images)
+
     save_json(diagnostic, output_path)
+    diagnostic_store.store(diagnostic, output_path, thermal, building_id)
 
     print("[DONE] Merge + validation complete.\n")
 
@@ -0,0 +1,61 @@
+import os
+import json
+import hashlib
+from importlib import metadata
+
+import sqlite_cache
+
+
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data",
+    ".ocr_cache.sqlite",
+)
+
+CACHE_PATH = os.getenv("OCR_CACHE_PATH", DEFAULT_PATH)
+MAX_BYTES = int(float(os.getenv("OCR_CACHE_MAX_MB", "64")) * 1024 * 1024)
+TTL_SECONDS = int(float(os.getenv("OCR_CACHE_TTL_DAYS", "90")) * 86400)
+
+# Reads are skipped but fresh results are still written back.
+BYPASS = os.getenv("OCR_CACHE_BYPASS", "").lower() in {"1", "true", "yes"}
+
+
+def easyocr_version() -> str:
+    # Read from the package metadata: importing easyocr would load torch.
+    try:
+        return metadata.version("easyocr")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def make_key(fingerprint: str, dpi: int, langs: list, version: str) -> str:
+    h = hashlib.sha256()
+    for part in (fingerprint, str(dpi), ",".join(langs), version):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+
+    return h.hexdigest()
+
+
+_cache = sqlite_cache.Singleton(
+    lambda: sqlite_cache.SQLiteCache(
+        CACHE_PATH, "pages", MAX_BYTES, TTL_SECONDS, BYPASS,
+        encode=lambda lines: json.dumps(lines, ensure_ascii=False),
+        decode=json.loads,
+    )
+)
+
+
+def get_cache() -> sqlite_cache.SQLiteCache:
+    return _cache.get()
+
+
+def print_stats():
+    if _cache.cache is None:
+        return
+
+    s = _cache.cache.stats()
+    print(
+        f"[CACHE] OCR pages: {s['hits']} hits, {s['misses']} misses "
+        f"({s['entries']} entries, {s['bytes'] / 1024:.1f} KiB on disk)"
+    )
@@ -0,0 +1,78 @@
+import os
+import json
+
+
+INDEX_SUFFIX = ".pages.json"
+
+
+def index_path(txt_path: str) -> str:
+    return os.path.splitext(txt_path)[0] + INDEX_SUFFIX
+
+
+def write_pages(blocks, output_path: str, check=None) -> dict:
+    """
+    Stream (page_number, block) pairs to `output_path` as they are produced.
+
+    Text goes to a temporary file first; `check` (if given) runs after the
+    last page and may raise to abort without leaving a partial output. A
+    side index of page -> [start, end] byte offsets is written next to the
+    text so readers can seek straight to a page.
+    """
+    tmp = output_path + ".part"
+    index = {}
+
+    try:
+        with open(tmp, "wb") as f:
+            for page, block in blocks:
+                start = f.tell()
+                f.write(block.encode("utf-8"))
+
+                # Native and OCR blocks of one page share a single range.
+                key = str(page)
+                index[key] = [index[key][0] if key in index else start, f.tell()]
+
+        if check:
+            check()
+
+        os.replace(tmp, output_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    with open(index_path(output_path), "w", encoding="utf-8") as f:
+        json.dump({"file": os.path.basename(output_path), "pages": index}, f, indent=2)
+
+    return index
+
+
+def load_index(txt_path: str) -> dict:
+    path = index_path(txt_path)
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"[ERROR] Page index not found: {path}")
+
+    with open(path, "r", encoding="utf-8") as f:
+        return {int(k): v for k, v in json.load(f)["pages"].items()}
+
+
+def read_pages(txt_path: str, pages=None) -> dict:
+    """Read selected pages (all when None) using the byte-offset index."""
+    index = load_index(txt_path)
+    wanted = sorted(index) if pages is None else pages
+
+    out = {}
+    with open(txt_path, "rb") as f:
+        for page in wanted:
+            if page not in index:
+                continue
+            start, end = index[page]
+            f.seek(start)
+            out[page] = f.read(end - start).decode("utf-8")
+
+    return out
+
+
+def read_text(txt_path: str) -> str:
+    with open(txt_path, "r", encoding="utf-8") as f:
+        return f.read()
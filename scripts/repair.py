@@ -0,0 +1,147 @@
+import os
+import re
+import json
+
+import llm_cache
+import llm_client
+
+
+# Follow-up calls allowed per batch of invalid items before giving up on them.
+REPAIR_RETRIES = int(os.getenv("LLM_REPAIR_RETRIES", "2"))
+
+FENCE_RE = re.compile(r"^\s*```[\w-]*\s*\n?|\n?\s*```\s*$")
+
+
+def strip_fences(raw: str) -> str:
+    """Remove a markdown code fence wrapped around a JSON reply."""
+    return FENCE_RE.sub("", raw).strip()
+
+
+def loads(raw: str):
+    """
+    json.loads with the local fixes a model reply usually needs: a
+    ```json fence, or a sentence before/after the object.
+    """
+    text = strip_fences(raw)
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            return json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            pass
+
+    raise ValueError("[ERROR] LLM did not return valid JSON.")
+
+
+def build_reask_prompt(schema: str, text: str, failing: list) -> str:
+    listing = json.dumps(
+        [{"item": item, "problems": problems} for item, problems in failing],
+        indent=2,
+        ensure_ascii=False,
+    )
+
+    return f"""
+You extracted the items below from the source text, but they failed validation.
+
+Correct ONLY these items. Every corrected item must follow this structure:
+
+{schema}
+
+Return STRICT JSON in this exact format, with exactly {len(failing)} item(s) in the same order:
+
+{{
+  "items": [ ... ]
+}}
+
+Rules:
+- Use ONLY the source text.
+- Do NOT invent data; use "Not Available" where the text is silent.
+- Return valid JSON only.
+
+Items to correct:
+-----------------
+{listing}
+
+Source Text:
+------------
+{text}
+"""
+
+
+def reask(model: str, schema: str, text: str, failing: list) -> list:
+    """Ask the model to correct `failing` [(item, problems)] against `text`."""
+    expected = len(failing)
+
+    def parse(raw):
+        data = loads(raw)
+        items = data.get("items") if isinstance(data, dict) else None
+
+        if not isinstance(items, list) or len(items) != expected:
+            raise ValueError(f"[ERROR] Repair reply must hold {expected} item(s).")
+
+        return items
+
+    return llm_cache.complete(
+        model,
+        [
+            {"role": "system", "content": "Return strict JSON only."},
+            {"role": "user", "content": build_reask_prompt(schema, text, failing)}
+        ],
+        temperature=0,
+        parse=parse,
+    )
+
+
+def repair_items(label: str, items: list, check, fix=None, ask=None, fallback=None,
+                 retries: int = REPAIR_RETRIES) -> list:
+    """
+    Keep the valid items of an LLM reply and repair the rest.
+
+    `fix(item)` applies deterministic local fixes, `check(item)` returns the
+    remaining problems (empty when valid) and `ask(failing)` re-asks the
+    model about the [(item, problems)] still failing, returning corrected
+    items in the same order. Items that are still invalid once `retries`
+    follow-up calls are spent are replaced by `fallback(item)` if given and
+    dropped otherwise. Valid items keep their position.
+    """
+    if fix:
+        items = [fix(item) for item in items]
+
+    bad = {i: check(item) for i, item in enumerate(items)}
+    bad = {i: problems for i, problems in bad.items() if problems}
+
+    attempt = 0
+    while bad and ask and attempt < retries:
+        attempt += 1
+        indices = sorted(bad)
+        print(f"[REPAIR] {label}: re-asking about {len(indices)} invalid item(s) (attempt {attempt}/{retries})")
+
+        try:
+            replies = ask([(items[i], bad[i]) for i in indices])
+        except (ValueError, llm_client.LLMError) as e:
+            print(f"[WARNING] {label}: repair call failed: {e}")
+            continue
+
+        for i, item in zip(indices, replies):
+            items[i] = fix(item) if fix else item
+            problems = check(items[i])
+
+            if problems:
+                bad[i] = problems
+            else:
+                del bad[i]
+
+    for i in sorted(bad):
+        print(f"[WARNING] {label}: item {i} still invalid ({'; '.join(bad[i])}), "
+              f"{'using fallback' if fallback else 'dropped'}")
+
+    if fallback:
+        return [fallback(item) if i in bad else item for i, item in enumerate(items)]
+
+    return [item for i, item in enumerate(items) if i not in bad]
@@ -0,0 +1,265 @@
+import os
+import sys
+import json
+import glob
+import time
+
+import numpy as np
+
+
+# -----------------------------
+# Rule table
+# -----------------------------
+#
+# Conditions are nested {"all": [...]}, {"any": [...]},
+# {"field": "<section>.<field>", "equals": value} and {"min_areas": n}.
+# Root causes are reported in table order; the first matching severity wins.
+
+RULES = {
+    "root_causes": [
+        {
+            "cause": "Bathroom waterproofing failure",
+            "when": {"field": "bathroom_issues.tile_joint_gaps", "equals": "Yes"},
+        },
+        {
+            "cause": "External wall crack ingress",
+            "when": {"field": "external_wall.cracks_present", "equals": "Yes"},
+        },
+        {
+            "cause": "Terrace surface deterioration",
+            "when": {"field": "terrace.surface_cracks", "equals": "Yes"},
+        },
+        {
+            "cause": "Vertical moisture migration",
+            "when": {"field": "parking.ceiling_leakage", "equals": "Yes"},
+        },
+    ],
+    "severity": [
+        {
+            "level": "High",
+            "when": {"all": [
+                {"min_areas": 4},
+                {"any": [
+                    {"field": "bathroom_issues.tile_joint_gaps", "equals": "Yes"},
+                    {"field": "terrace.surface_cracks", "equals": "Yes"},
+                ]},
+                {"field": "parking.ceiling_leakage", "equals": "Yes"},
+            ]},
+        },
+        {
+            "level": "Moderate",
+            "when": {"all": [
+                {"min_areas": 2},
+                {"any": [
+                    {"field": "bathroom_issues.tile_joint_gaps", "equals": "Yes"},
+                    {"field": "external_wall.cracks_present", "equals": "Yes"},
+                ]},
+            ]},
+        },
+    ],
+    "default_severity": "Low",
+}
+
+SEVERITY_LEVELS = ("Low", "Moderate", "High")
+
+
+# -----------------------------
+# Compilation
+# -----------------------------
+
+def _compile(expr, fields: set):
+    """Turn one condition into a function of the batch columns → bool array."""
+    if "all" in expr or "any" in expr:
+        op = "all" if "all" in expr else "any"
+        parts = [_compile(e, fields) for e in expr[op]]
+        reduce = np.logical_and.reduce if op == "all" else np.logical_or.reduce
+
+        if not parts:
+            raise ValueError(f"[ERROR] Empty '{op}' in rule: {expr}")
+
+        return lambda cols: reduce([p(cols) for p in parts])
+
+    if "field" in expr:
+        key = tuple(expr["field"].split(".", 1))
+        if len(key) != 2:
+            raise ValueError(f"[ERROR] Rule field must be <section>.<field>: {expr['field']}")
+
+        value = expr["equals"]
+        fields.add(key)
+        return lambda cols: cols[key] == value
+
+    if "min_areas" in expr:
+        n = expr["min_areas"]
+        return lambda cols: cols["impacted_areas"] >= n
+
+    raise ValueError(f"[ERROR] Unknown rule condition: {expr}")
+
+
+def compile_rules(rules: dict = RULES) -> dict:
+    """Compile a rule table once into a plan that scores whole batches."""
+    fields = set()
+
+    root_causes = [(r["cause"], _compile(r["when"], fields)) for r in rules["root_causes"]]
+    severity = [(r["level"], _compile(r["when"], fields)) for r in rules["severity"]]
+
+    for level, _ in severity:
+        if level not in SEVERITY_LEVELS:
+            raise ValueError(f"[ERROR] Invalid severity level in rules: {level}")
+
+    return {
+        "fields": sorted(fields),
+        "root_causes": root_causes,
+        "severity": severity,
+        "default_severity": rules["default_severity"],
+    }
+
+
+_plan = None
+
+
+def default_plan() -> dict:
+    global _plan
+
+    if _plan is None:
+        _plan = compile_rules(RULES)
+
+    return _plan
+
+
+# -----------------------------
+# Batch evaluation
+# -----------------------------
+
+def build_columns(plan: dict, buildings: list) -> dict:
+    """
+    One array per field the plan reads, plus impacted_areas. `buildings`
+    is a list of (areas, systems) pairs.
+    """
+    n = len(buildings)
+
+    cols = {
+        "impacted_areas": np.fromiter((len(areas) for areas, _ in buildings), int, n),
+    }
+
+    for section, field in plan["fields"]:
+        cols[(section, field)] = np.array(
+            [systems.get(section, {}).get(field, "Not Available") for _, systems in buildings],
+            dtype=object,
+        )
+
+    return cols
+
+
+def evaluate(plan: dict, buildings: list) -> list:
+    """Return [{"primary_root_causes": [...], "severity": ...}] per building."""
+    if not buildings:
+        return []
+
+    cols = build_columns(plan, buildings)
+    n = len(buildings)
+
+    causes = [name for name, _ in plan["root_causes"]]
+    hits = np.column_stack([
+        np.broadcast_to(pred(cols), (n,)) for _, pred in plan["root_causes"]
+    ]) if causes else np.zeros((n, 0), dtype=bool)
+
+    severity = np.select(
+        [np.broadcast_to(pred(cols), (n,)) for _, pred in plan["severity"]],
+        [level for level, _ in plan["severity"]],
+        default=plan["default_severity"],
+    )
+
+    # Buildings share few distinct cause combinations; build each list once.
+    codes = hits.astype(np.int64) @ (1 << np.arange(len(causes), dtype=np.int64))
+    combos = {
+        int(code): [causes[j] for j in range(len(causes)) if int(code) >> j & 1]
+        for code in np.unique(codes)
+    }
+
+    return [
+        {"primary_root_causes": list(combos[code]), "severity": level}
+        for code, level in zip(codes.tolist(), severity.tolist())
+    ]
+
+
+# -----------------------------
+# Re-scoring stored diagnostics
+# -----------------------------
+
+SYSTEM_SECTIONS = ("bathroom_issues", "external_wall", "terrace", "parking")
+
+
+def find_diagnostics(targets: list) -> list:
+    paths = []
+
+    for target in targets:
+        if os.path.isdir(target):
+            paths += sorted(glob.glob(os.path.join(target, "**", "diagnostic.json"), recursive=True))
+        elif os.path.exists(target):
+            paths.append(target)
+        else:
+            raise FileNotFoundError(f"[ERROR] Not found: {target}")
+
+    return paths
+
+
+def rescore(paths: list, write: bool = False, plan: dict = None) -> dict:
+    plan = plan or default_plan()
+
+    diagnostics = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            diagnostics.append(json.load(f))
+
+    buildings = [
+        (d["areas"], {s: d.get(s, {}) for s in SYSTEM_SECTIONS})
+        for d in diagnostics
+    ]
+
+    changed = 0
+    rewritten = []
+    for path, d, scored in zip(paths, diagnostics, evaluate(plan, buildings)):
+        overall = d["overall"]
+
+        if overall.get("primary_root_causes") == scored["primary_root_causes"] \
+                and overall.get("severity") == scored["severity"]:
+            continue
+
+        changed += 1
+        overall.update(scored)
+
+        if write:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(d, f, indent=2)
+            rewritten.append(path)
+
+    if rewritten:
+        # Imported here: diagnostic_store itself imports this module.
+        import diagnostic_store
+        diagnostic_store.store_files(rewritten)
+
+    return {"buildings": len(paths), "changed": changed}
+
+
+def main():
+    args = [a for a in sys.argv[1:] if a != "--write"]
+    write = "--write" in sys.argv[1:]
+
+    if not args:
+        print("Usage: python rules.py <diagnostic.json | directory>... [--write]")
+        sys.exit(1)
+
+    paths = find_diagnostics(args)
+
+    started = time.perf_counter()
+    result = rescore(paths, write=write)
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"[INFO] Re-scored {result['buildings']} building(s) in {elapsed:.2f}s, "
+        f"{result['changed']} changed" + ("" if write else " (dry run, pass --write to update)")
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import os
+import time
+import sqlite3
+import threading
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_{table}_last_used ON {table}(last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def _identity(value):
+    return value
+
+
+class SQLiteCache:
+    """
+    On-disk LRU cache with a TTL, one row per key in `table`.
+
+    Values are stored as text: `encode` turns a value into a string and
+    `decode` turns it back (both default to the identity).
+    """
+
+    def __init__(self, path, table, max_bytes, ttl_seconds, bypass=False,
+                 encode=_identity, decode=_identity):
+        self.path = path
+        self.table = table
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.bypass = bypass
+        self.encode = encode
+        self.decode = decode
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+
+        # A table written with an older column layout is only a cache: drop it.
+        columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        if columns and "value" not in columns:
+            self._conn.execute(f"DROP TABLE {table}")
+
+        self._conn.executescript(SCHEMA.format(table=table))
+
+    def get(self, key: str):
+        if self.bypass:
+            self._count("misses")
+            return None
+
+        now = time.time()
+
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row and now - row[1] > self.ttl_seconds:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                row = None
+
+            if row:
+                self._conn.execute(
+                    f"UPDATE {self.table} SET last_used = ? WHERE key = ?", (now, key)
+                )
+
+        self._count("hits" if row else "misses")
+        return self.decode(row[0]) if row else None
+
+    def put(self, key: str, value):
+        now = time.time()
+        payload = self.encode(value)
+        size = len(payload.encode("utf-8"))
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} "
+                "(key, value, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE created_at < ?",
+            (time.time() - self.ttl_seconds,),
+        )
+
+        total = self._conn.execute(
+            f"SELECT COALESCE(SUM(size), 0) FROM {self.table}"
+        ).fetchone()[0]
+
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used rows until the cache fits again.
+        rows = self._conn.execute(
+            f"SELECT key, size FROM {self.table} ORDER BY last_used ASC"
+        ).fetchall()
+
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+
+        self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", stale)
+
+    def _count(self, name: str):
+        with self._lock, self._conn:
+            if name == "hits":
+                self.hits += 1
+            else:
+                self.misses += 1
+
+            self._conn.execute(
+                "INSERT INTO counters (name, value) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+                (name,),
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+            totals = dict(self._conn.execute("SELECT name, value FROM counters"))
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": totals.get("hits", 0),
+            "total_misses": totals.get("misses", 0),
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+class Singleton:
+    """One cache per process, opened on first use."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self.cache = None
+
+    def get(self) -> SQLiteCache:
+        with self._lock:
+            if self.cache is None:
+                self.cache = self._factory()
+
+        return self.cache
@@ -0,0 +1,86 @@
+import os
+import json
+import hashlib
+
+
+MANIFEST_NAME = ".stage_cache.json"
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path: str) -> str:
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"[ERROR] Cannot hash missing file: {path}")
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+def source_digest(module) -> str:
+    """Hash of a stage module's source, used as its code version."""
+    return file_digest(module.__file__)
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def stage_key(parts: list) -> str:
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return text_digest(payload)
+
+
+# -----------------------------
+# Manifest
+# -----------------------------
+
+def manifest_path(out_dir: str) -> str:
+    return os.path.join(out_dir, MANIFEST_NAME)
+
+
+def load_manifest(out_dir: str) -> dict:
+    path = manifest_path(out_dir)
+
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        print(f"[WARNING] Ignoring unreadable stage cache: {path}")
+        return {}
+
+
+def save_manifest(manifest: dict, out_dir: str):
+    path = manifest_path(out_dir)
+    tmp = path + ".tmp"
+
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    os.replace(tmp, path)
+
+
+def is_fresh(manifest: dict, stage: str, key: str, output_path: str) -> bool:
+    entry = manifest.get(stage)
+
+    if not entry or entry.get("key") != key:
+        return False
+
+    if not os.path.exists(output_path):
+        return False
+
+    # An artifact edited by hand since it was produced is not trusted.
+    return entry.get("output_digest") == file_digest(output_path)
+
+
+def record(manifest: dict, stage: str, key: str, output_path: str):
+    manifest[stage] = {
+        "key": key,
+        "output_digest": file_digest(output_path),
+    }
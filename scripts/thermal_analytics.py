@@ -0,0 +1,132 @@
+import os
+
+import numpy as np
+
+
+# ΔT (hotspot - coldspot, °C) at or above which a reading indicates moisture.
+MOISTURE_THRESHOLD = float(os.getenv("THERMAL_MOISTURE_THRESHOLD", "3.0"))
+
+PERCENTILES = (50, 90, 95)
+
+# Tukey fences: ΔT beyond Q3 + k·IQR (or below Q1 - k·IQR) is an outlier.
+OUTLIER_IQR_FACTOR = 1.5
+
+
+def _number(value) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return np.nan
+
+
+def to_columns(readings: list) -> dict:
+    """Lay thermal readings out as columnar arrays, NaN where a value is not a number."""
+    n = len(readings)
+    rows = [r if isinstance(r, dict) else {} for r in readings]
+
+    return {
+        "hotspot": np.fromiter((_number(r.get("hotspot_temp")) for r in rows), float, n),
+        "coldspot": np.fromiter((_number(r.get("coldspot_temp")) for r in rows), float, n),
+        "reported_diff": np.fromiter((_number(r.get("temperature_difference")) for r in rows), float, n),
+        "moisture_ok": np.fromiter((r.get("moisture_indicator") in ("Yes", "No") for r in rows), bool, n),
+        "image_name": np.array([str(r.get("image_name", "")) for r in rows], dtype=object),
+    }
+
+
+def delta_t(cols: dict) -> np.ndarray:
+    return np.round(cols["hotspot"] - cols["coldspot"], 2)
+
+
+def invalid_rows(readings: list, required: set) -> np.ndarray:
+    """Indices of readings that are incomplete, non-numeric or inconsistent."""
+    n = len(readings)
+    cols = to_columns(readings)
+
+    complete = np.fromiter(
+        (isinstance(r, dict) and required <= r.keys() for r in readings), bool, n
+    )
+
+    numeric = (
+        np.isfinite(cols["hotspot"])
+        & np.isfinite(cols["coldspot"])
+        & np.isfinite(cols["reported_diff"])
+    )
+
+    with np.errstate(invalid="ignore"):
+        consistent = np.abs(delta_t(cols) - cols["reported_diff"]) <= 0.1
+
+    return np.flatnonzero(~(complete & numeric & consistent & cols["moisture_ok"]))
+
+
+def _describe(values: np.ndarray, threshold: float) -> dict:
+    if values.size == 0:
+        return {"readings": 0, "moisture_readings": 0}
+
+    stats = {
+        "readings": int(values.size),
+        "moisture_readings": int(np.count_nonzero(values >= threshold)),
+        "min": round(float(values.min()), 2),
+        "mean": round(float(values.mean()), 2),
+        "max": round(float(values.max()), 2),
+    }
+
+    for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        stats[f"p{p}"] = round(float(v), 2)
+
+    return stats
+
+
+def outlier_mask(values: np.ndarray, factor: float = OUTLIER_IQR_FACTOR) -> np.ndarray:
+    if values.size < 4:
+        return np.zeros(values.shape, dtype=bool)
+
+    q1, q3 = np.percentile(values, [25, 75])
+    spread = factor * (q3 - q1)
+
+    return (values < q1 - spread) | (values > q3 + spread)
+
+
+def summarise(readings: list, area_images: dict = None, threshold: float = MOISTURE_THRESHOLD) -> dict:
+    """
+    Report-level and per-area ΔT statistics.
+
+    `area_images` maps an area name to the image_names matched to it (as
+    set by merge.attach_thermal); readings are grouped through it.
+    """
+    cols = to_columns(readings)
+    dt = delta_t(cols)
+    valid = np.isfinite(dt)
+    dt, images = dt[valid], cols["image_name"][valid]
+
+    summary = {
+        "moisture_threshold": threshold,
+        **_describe(dt, threshold),
+        "outliers": images[outlier_mask(dt)].tolist(),
+        "by_area": {},
+    }
+
+    if not area_images or dt.size == 0:
+        return summary
+
+    # Group-by without a Python loop over readings: one (area, reading)
+    # pair per match, sorted by area, then split into contiguous runs.
+    position = {name: i for i, name in enumerate(images.tolist())}
+    names = list(area_images)
+
+    pairs = [
+        (a, position[img])
+        for a, name in enumerate(names)
+        for img in area_images[name]
+        if img in position
+    ]
+    if not pairs:
+        return summary
+
+    area_idx, reading_idx = np.array(pairs).T
+    order = np.argsort(area_idx, kind="stable")
+    area_idx, values = area_idx[order], dt[reading_idx[order]]
+
+    groups, starts = np.unique(area_idx, return_index=True)
+    for a, chunk in zip(groups, np.split(values, starts[1:])):
+        summary["by_area"][names[a]] = _describe(chunk, threshold)
+
+    return summary
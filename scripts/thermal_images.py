@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import hashlib
+
+import fitz
+
+import extract_text_ocr
+import extract_thermal
+
+
+# Camera images are far larger than the logos and scale icons drawn next
+# to them; anything smaller than this is page furniture.
+MIN_IMAGE_PIXELS = 200 * 200
+
+# Shared store for several buildings; by default each output directory
+# gets its own images/ folder.
+IMAGE_STORE = os.getenv("THERMAL_IMAGE_STORE") or None
+
+
+
+# -----------------------------
+# Locating images on a page
+# -----------------------------
+
+def image_filter(doc, xref):
+    kind, value = doc.xref_get_key(xref, "Filter")
+    return value if kind == "name" else None
+
+
+def image_bytes(doc, xref):
+    """
+    The image as stored in the file. JPEG streams are copied byte for
+    byte; anything else is decoded to PyMuPDF's native format.
+    """
+    if image_filter(doc, xref) == "/DCTDecode":
+        return doc.xref_stream_raw(xref), "jpg"
+
+    extracted = doc.extract_image(xref)
+    return extracted["image"], extracted["ext"]
+
+
+def camera_images(doc, page) -> list:
+    images = []
+
+    for xref in extract_text_ocr.drawn_images(page):
+        width = doc.xref_get_key(xref, "Width")[1]
+        height = doc.xref_get_key(xref, "Height")[1]
+
+        try:
+            pixels = int(width) * int(height)
+        except ValueError:
+            continue
+
+        if pixels >= MIN_IMAGE_PIXELS:
+            images.append((xref, int(width), int(height)))
+
+    return images
+
+
+# -----------------------------
+# Content-addressed store
+# -----------------------------
+
+def store_image(store_dir, data: bytes, ext: str) -> str:
+    """Write data under its SHA-256 (once) and return the file path."""
+    digest = hashlib.sha256(data).hexdigest()
+    folder = os.path.join(store_dir, digest[:2])
+    path = os.path.join(folder, f"{digest}.{ext}")
+
+    if not os.path.exists(path):
+        os.makedirs(folder, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.part"
+
+        with open(tmp, "wb") as f:
+            f.write(data)
+
+        os.replace(tmp, path)
+
+    return path
+
+
+# -----------------------------
+# Extraction
+# -----------------------------
+
+def page_image_names(text: str) -> dict:
+    """page number -> image_name parsed from the extracted thermal text."""
+    names = {}
+
+    for number, body in extract_thermal.split_pages(text):
+        match = extract_thermal.IMAGE_RE.search(body)
+        if number is not None and match and number not in names:
+            names[number] = match.group(1)
+
+    return names
+
+
+def extract_images(pdf, text, store_dir, output_path) -> dict:
+    """
+    Pull the camera images out of a thermal PDF without rendering pages.
+
+    The first large image on a page is the thermal picture, any further
+    ones the visual photo(s). Each is stored once under its content hash;
+    the index written to output_path pairs them with the page's image_name.
+    Paths in the index are relative to its own directory.
+    """
+    extract_text_ocr.validate_file(pdf)
+
+    names = page_image_names(text)
+    base = os.path.dirname(os.path.abspath(output_path))
+
+    pages = []
+    stored = {}
+    stats = {"pages": 0, "images": 0, "unique": 0, "bytes": 0, "unnamed": 0}
+
+    with fitz.open(pdf) as doc:
+        stats["pages"] = doc.page_count
+
+        for i in range(doc.page_count):
+            images = camera_images(doc, doc.load_page(i))
+            if not images:
+                continue
+
+            files = []
+            for xref, width, height in images:
+                if xref not in stored:
+                    data, ext = image_bytes(doc, xref)
+                    path = store_image(store_dir, data, ext)
+                    stored[xref] = {
+                        "path": os.path.relpath(os.path.abspath(path), base),
+                        "sha256": os.path.basename(path).split(".")[0],
+                        "width": width,
+                        "height": height,
+                        "bytes": len(data),
+                    }
+                    stats["unique"] += 1
+                    stats["bytes"] += len(data)
+
+                files.append(stored[xref])
+
+            stats["images"] += len(files)
+
+            image_name = names.get(i + 1)
+            if image_name is None:
+                stats["unnamed"] += 1
+
+            pages.append({
+                "page": i + 1,
+                "image_name": image_name,
+                "thermal": files[0],
+                "visual": files[1:],
+            })
+
+    data = {"images": pages, "stats": stats}
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+    print(f"[INFO] Pages: {stats['pages']}, camera images: {stats['images']} "
+          f"({stats['unique']} unique, {stats['bytes'] / 1e6:.1f} MB)")
+    if stats["unnamed"]:
+        print(f"[WARNING] {stats['unnamed']} page(s) with images but no parsed image_name")
+    print(f"[SUCCESS] Image index saved → {output_path}")
+
+    return data
+
+
+def main():
+    if len(sys.argv) not in (4, 5):
+        print("Usage: python thermal_images.py <thermal_pdf> <thermal_txt> <thermal_images_json> [store_dir]")
+        sys.exit(1)
+
+    pdf = sys.argv[1]
+    output_path = sys.argv[3]
+    if len(sys.argv) == 5:
+        store_dir = sys.argv[4]
+    else:
+        store_dir = IMAGE_STORE or os.path.join(os.path.dirname(os.path.abspath(output_path)), "images")
+
+    text = extract_thermal.read_text(sys.argv[2])
+    extract_images(pdf, text, store_dir, output_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# Rough chars-per-token ratio for English when tiktoken is not installed.
+CHARS_PER_TOKEN = 4
+
+# tiktoken is imported on the first count rather than at module load, so
+# scripts that exit on bad arguments do not pay for it.
+_tiktoken = None
+
+_encodings = {}
+
+
+def _load_tiktoken():
+    global _tiktoken
+
+    if _tiktoken is None:
+        try:
+            import tiktoken
+            _tiktoken = tiktoken
+        except ImportError:
+            _tiktoken = False
+
+    return _tiktoken
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    tiktoken = _load_tiktoken()
+
+    if not tiktoken:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("o200k_base")
+
+    return len(_encodings[model].encode(text))
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import resource
+import threading
+import contextlib
+
+
+# None while tracing is off, so the hooks in the stages cost one check.
+_events = None
+_lock = threading.Lock()
+
+
+def enable():
+    """Start a fresh trace in this process."""
+    global _events
+
+    with _lock:
+        _events = []
+
+
+def enabled() -> bool:
+    return _events is not None
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _thread():
+    current = threading.current_thread()
+    return {"pid": os.getpid(), "tid": current.ident, "thread": current.name}
+
+
+def _append(record):
+    with _lock:
+        if _events is not None:
+            _events.append(record)
+
+
+def add_span(name: str, cat: str, start: float, wall: float, **args):
+    """Record a span measured by the caller (start is time.perf_counter())."""
+    if _events is None:
+        return
+
+    _append({
+        "type": "span",
+        "name": name,
+        "cat": cat,
+        "ts": start,
+        "wall_s": round(wall, 6),
+        **_thread(),
+        "args": args,
+    })
+
+
+def event(name: str, cat: str, **args):
+    if _events is None:
+        return
+
+    _append({
+        "type": "event",
+        "name": name,
+        "cat": cat,
+        "ts": time.perf_counter(),
+        **_thread(),
+        "args": args,
+    })
+
+
+@contextlib.contextmanager
+def span(name: str, cat: str, **args):
+    """
+    Time the block: wall and thread CPU time, and the process peak RSS when
+    it ends. The yielded dict can be filled with extra args.
+    """
+    if _events is None:
+        yield args
+        return
+
+    start = time.perf_counter()
+    cpu = time.thread_time()
+
+    try:
+        yield args
+    finally:
+        _append({
+            "type": "span",
+            "name": name,
+            "cat": cat,
+            "ts": start,
+            "wall_s": round(time.perf_counter() - start, 6),
+            "cpu_s": round(time.thread_time() - cpu, 6),
+            "peak_rss_mb": peak_rss_mb(),
+            **_thread(),
+            "args": args,
+        })
+
+
+def drain() -> list:
+    """Hand over and clear the events recorded so far (used by OCR workers)."""
+    global _events
+
+    with _lock:
+        if _events is None:
+            return []
+        events, _events = _events, []
+
+    return events
+
+
+def extend(events: list):
+    """Merge events recorded in another process."""
+    with _lock:
+        if _events is not None:
+            _events.extend(events)
+
+
+def snapshot() -> list:
+    with _lock:
+        return list(_events or [])
+
+
+# -----------------------------
+# Writers
+# -----------------------------
+
+def write_jsonl(path: str):
+    events = sorted(snapshot(), key=lambda e: e["ts"])
+    origin = events[0]["ts"] if events else 0.0
+
+    with open(path, "w", encoding="utf-8") as f:
+        for e in events:
+            f.write(json.dumps(dict(e, ts=round(e["ts"] - origin, 6))) + "\n")
+
+    print(f"[TRACE] {len(events)} events → {path}")
+
+
+def write_chrome(path: str):
+    """Chrome trace-event format, for chrome://tracing or Perfetto."""
+    events = sorted(snapshot(), key=lambda e: e["ts"])
+    origin = events[0]["ts"] if events else 0.0
+
+    trace_events = []
+    threads = {}
+
+    for e in events:
+        threads[(e["pid"], e["tid"])] = e["thread"]
+
+        args = dict(e["args"])
+        for extra in ("cpu_s", "peak_rss_mb"):
+            if extra in e:
+                args[extra] = e[extra]
+
+        record = {
+            "name": e["name"],
+            "cat": e["cat"],
+            "ts": round((e["ts"] - origin) * 1e6, 1),
+            "pid": e["pid"],
+            "tid": e["tid"],
+            "args": args,
+        }
+
+        if e["type"] == "span":
+            record.update(ph="X", dur=round(e["wall_s"] * 1e6, 1))
+        else:
+            record.update(ph="i", s="t")
+
+        trace_events.append(record)
+
+    for (pid, tid), name in threads.items():
+        trace_events.append({
+            "name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+            "args": {"name": name},
+        })
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+
+    print(f"[TRACE] Chrome trace → {path}")